@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the convert, join and match actions over the experiments in
+test_data/test_input, optionally scaled up to x10 and x100 rows. The actions are
+run as from the command line and their stage timings are taken from the pipeline
+profiler, wall time, rows and the peak resident set reached by the end of every
+stage are reported and stored in benchmarks/results so that runs on different
+commits can be compared. Every case runs in its own process, so that its memory use
+is not hidden by the peak of the cases before it.
+
+Run from the repository root:
+    python -m benchmarks.pipeline --scales 1 10
+    python -m benchmarks.pipeline --compare benchmarks/results/<previous>.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+import numpy as np
+import pandas as pd
+import clams_convert.custom_parser as fp
+from clams_convert import errors as e
+from clams_convert.action import Action, Convert, Join, Match, parse_source
+from clams_convert.col_mapper import ColMapper
+from clams_convert.file_scanner import FileScanner
+from clams_convert.profiler import profiler
+
+input_path_prefix = "test_data/test_input/"
+results_path = "benchmarks/results/"
+
+# experiments without light phases are not aggregated
+cases = {
+    "classic_1": dict(action=Convert, parser=fp.ClamsOxymaxParser, system="clams-oxymax",
+                      time_fmt_in="%m/%d/%Y %I:%M:%S %p", frequency=3600),
+    "classic_2": dict(action=Convert, parser=fp.ClamsOxymaxParser, system="clams-oxymax",
+                      time_fmt_in="%d/%m/%Y %H:%M:%S", frequency=3600),
+    "classic_3": dict(action=Convert, parser=fp.ClamsOxymaxParser, system="clams-oxymax",
+                      time_fmt_in="%d/%m/%Y %H:%M:%S", frequency=3600),
+    "paula_tse_1": dict(action=Convert, parser=fp.ClamsTseParser, system="clams-tse",
+                        time_fmt_in="%m/%d/%y %H:%M", frequency=0),
+    "zierath_1": dict(action=Convert, parser=fp.FwrZierathParser, system="fwr-zierath",
+                      time_fmt_in="%d/%m/%Y %H:%M:%S", frequency=0),
+    "zierath_2": dict(action=Convert, parser=fp.FwrZierathParser, system="fwr-zierath",
+                      time_fmt_in="%d/%m/%Y %H:%M:%S", frequency=0),
+    "zierath_3": dict(action=Convert, parser=fp.FwrZierathParser, system="fwr-zierath",
+                      time_fmt_in="%d/%m/%Y %H:%M:%S", frequency=0),
+    "zierathold_1": dict(action=Convert, parser=fp.FwrZierathOldParser, system="fwr-zierathold",
+                         time_fmt_in="%m/%d/%y %H:%M:%S", frequency=0),
+    "join_1": dict(action=Join, frequency=0),
+    "match_1": dict(action=Match, frequency=0),
+}
+
+
+class ScaledConvert(Convert):
+    """Convert action over raw files with the data section repeated. Parsing is timed
+    on the scaled files, the following stages get the parsed experiment repeated in
+    time, so that they work on a regular series factor times longer."""
+
+    def __init__(self, parser, cmd, sources, factor):
+        super().__init__(parser, cmd)
+        self.sources = sources
+        self.factor = factor
+
+    def parse_files(self):
+        super().parse_files()
+        first = len(profiler.records)
+        parsed = [parse_source(self.parser, x)[1] for x in self.sources]
+        del profiler.records[first:]
+        return [scale_frame(x, self.factor) for x in parsed if x is not None]
+
+
+def scale_file(file, factor, parser, directory):
+    # repeats the data section of a raw file factor times, only used to time parsing
+    with open(file, "rb") as current_file:
+        parser.locate_sections(current_file)
+        current_file.seek(0)
+        content = current_file.read()
+    start = parser.positions['data_start']
+    end = parser.positions.get('data_end', len(content))
+    block = content[start:end]
+    if not block.endswith(b"\n"):
+        block = block + b"\n"
+    scaled = os.path.join(directory, os.path.basename(file))
+    with open(scaled, "wb") as scaled_file:
+        scaled_file.write(content[:start] + block * factor + content[end:])
+    return scaled
+
+
+def scale_frame(data, factor):
+    # repeats the experiment factor times one after another in time, so that the
+    # downstream stages get a regular series factor times longer
+    data = data.reset_index(drop=True)
+    times = data.date_time.to_numpy()
+    steps = np.diff(times)
+    step = np.median(steps[steps > np.timedelta64(0)]) if np.any(steps > np.timedelta64(0)) else np.timedelta64(0)
+    span = times.max() - times.min() + step
+    length = data.interval.max() + 1
+    frames = [data.assign(date_time=data.date_time + span * i, interval=data.interval + length * i)
+              for i in range(factor)]
+    return pd.concat(frames, axis=0, ignore_index=True)
+
+
+def scale_subjects(file, factor, directory):
+    # repeats the subjects of an analysis-vis file factor times under new names, the
+    # experiments keep their time range so that they can still be joined and matched
+    with open(file) as current_file:
+        head, anchor, body = current_file.read().partition(Action.data_anchor + "\n")
+    data = pd.read_csv(io.StringIO(body), dtype={"subject": str})
+    frames = [data.assign(subject=data.subject + "_" + str(i)) for i in range(factor)]
+    scaled = os.path.join(directory, os.path.basename(file))
+    with open(scaled, "w") as scaled_file:
+        scaled_file.write(head + anchor)
+        pd.concat(frames, axis=0, ignore_index=True).to_csv(scaled_file, index=False)
+    return scaled
+
+
+def make_action(case, files, factor, directory):
+    output = os.path.join(directory, "output")
+    os.makedirs(output)
+    cmd = dict(output=output, frequency=case["frequency"], regularize=True, orientation="parameter-wide",
+               out_format="csv", dark_start="18:00:00", dark_end="06:00:00", match_start="1970-01-01")
+    if case["action"] is not Convert:
+        if factor > 1:
+            files = [scale_subjects(x, factor, directory) for x in files]
+        return case["action"](dict(cmd, files=files))
+
+    cmd = dict(cmd, system=case["system"], time_fmt_in=case["time_fmt_in"])
+    if factor == 1:
+        return Convert(case["parser"], dict(cmd, files=files))
+    parser = case["parser"](case["time_fmt_in"], ColMapper(case["system"]))
+    scaled = []
+    for file in files:
+        try:
+            scaled.append(scale_file(file, factor, parser, directory))
+        except e.FileFormatError:
+            # left to the action, which reports the file as skipped
+            scaled.append(file)
+    return ScaledConvert(case["parser"], dict(cmd, files=scaled), files, factor)
+
+
+def run_case(case, files, factor, directory):
+    # progress messages of the action are dropped, files it skipped are returned
+    action = make_action(case, files, factor, directory)
+    profiler.clear()
+    with contextlib.redirect_stdout(io.StringIO()):
+        action.export(action.run())
+    summary = profiler.summary()
+    profiler.clear()
+    return summary, getattr(action, "errors", dict())
+
+
+def run_single(name, factor, directory):
+    # one repetition of a case, run in a fresh process by measure; the stage records
+    # and skipped files are written to stdout as json
+    files = FileScanner(input_path_prefix + name, Action.accepted_extensions).scan_files()
+    summary, errors = run_case(cases[name], files, factor, directory)
+    records = [dict(case=name, scale=factor, stage=x.stage, calls=int(x.calls), seconds=x.seconds,
+                    peak_mb=None if pd.isna(x.peak_rss_mb) else x.peak_rss_mb, rows=int(x.rows))
+               for x in summary.itertuples()]
+    print(json.dumps(dict(records=records, files=len(files), errors=list(errors))))
+
+
+def measure(name, factor, repeat, directory):
+    # every repetition runs in its own process, a failing case is reported and
+    # contributes no records
+    best = None
+    for i in range(repeat):
+        run_directory = os.path.join(directory, "{}_x{}_{}".format(name, factor, i))
+        os.makedirs(run_directory)
+        process = subprocess.run([sys.executable, "-m", "benchmarks.pipeline", "--single", name, str(factor),
+                                  run_directory], capture_output=True, text=True)
+        shutil.rmtree(run_directory)
+        if process.returncode != 0:
+            lines = process.stderr.strip().splitlines()
+            print("\t{} x{} failed: {}".format(name, factor, lines[-1] if len(lines) > 0 else process.returncode),
+                  file=sys.stderr)
+            return []
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        if i == 0 and len(result["errors"]) > 0:
+            print("\t{} of {} files skipped: {}".format(len(result["errors"]), result["files"], ", ".join(
+                os.path.basename(x) for x in result["errors"])), file=sys.stderr)
+        if best is None or sum(x["seconds"] for x in result["records"]) < sum(x["seconds"] for x in best):
+            best = result["records"]
+    return best
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_table(records, previous=None):
+    reference = {}
+    if previous is not None:
+        reference = {(x["case"], x["scale"], x["stage"]): x["seconds"] for x in previous["records"]}
+    print("{:<14}{:>6} {:<11}{:>6}{:>10}{:>10}{:>10}{:>9}".format("case", "scale", "stage", "calls", "seconds",
+                                                                 "peak MB", "rows", "ratio"))
+    for x in records:
+        ratio = reference.get((x["case"], x["scale"], x["stage"]))
+        print("{:<14}{:>6} {:<11}{:>6}{:>10.4f}{:>10}{:>10}{:>9}".format(
+            x["case"], x["scale"], x["stage"], x["calls"], x["seconds"],
+            "-" if x["peak_mb"] is None else "{:.1f}".format(x["peak_mb"]), x["rows"],
+            "-" if not ratio else "{:.2f}".format(x["seconds"] / ratio)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', nargs="+", choices=cases.keys(), default=list(cases.keys()),
+                        help="Experiments to benchmark, default all")
+    parser.add_argument('--scales', nargs="+", type=int, default=[1, 10, 100],
+                        help="Row multipliers of the synthetic scaled experiments, default 1 10 100")
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="Number of timed repetitions, the fastest is reported. Default 1")
+    parser.add_argument('--compare', type=str,
+                        help="Results file of a previous run, stage times are reported relative to it")
+    parser.add_argument('--no_save', action='store_true', help="Do not store the results")
+    parser.add_argument('--single', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        name, factor, directory = args.single
+        return run_single(name, int(factor), directory)
+
+    records = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.cases:
+            if not os.path.isdir(input_path_prefix + name):
+                print("Input of {} is missing, skipped".format(name), file=sys.stderr)
+                continue
+            for factor in args.scales:
+                print("Benchmarking {} x{}".format(name, factor), file=sys.stderr)
+                records.extend(measure(name, factor, args.repeat, directory))
+
+    previous = None
+    if args.compare is not None:
+        with open(args.compare) as file:
+            previous = json.load(file)
+    print_table(records, previous)
+
+    if not args.no_save:
+        commit = git_commit()
+        result = dict(commit=commit, date=time.strftime("%Y-%m-%d %H:%M:%S"),
+                      python=platform.python_version(), pandas=pd.__version__, numpy=np.__version__,
+                      machine=platform.machine(), records=records)
+        os.makedirs(results_path, exist_ok=True)
+        path = results_path + time.strftime("%Y%m%d-%H%M%S") + "_" + commit + ".json"
+        with open(path, "w") as file:
+            json.dump(result, file, indent=1)
+        print("\nResults were saved to file: " + path)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,11 +5,19 @@ Data conversion tool from various activity and metabolic monitoring systems
 to formats suitable for analysis by activity-vis web based tool.
 """
 
+import os
 import argparse
+import cProfile
+import tracemalloc
+import collections
 import clams_convert.custom_parser as fp
+from clams_convert import errors as e
+from clams_convert.action import Action
 from clams_convert.action import Convert
 from clams_convert.action import Join
 from clams_convert.action import Match
+from clams_convert.detector import Detector
+from clams_convert.file_scanner import FileScanner
 
 available_parsers = {"clams-oxymax": fp.ClamsOxymaxParser,
                      "clams-tse": fp.ClamsTseParser,
@@ -18,22 +26,43 @@ available_parsers = {"clams-oxymax": fp.ClamsOxymaxParser,
                      "fwr-canlon": fp.FwrCanlonParser,
                      "fwr-westerblad": fp.FwrWesterbladParser}
 
-# TODO only detect parser in convert
-# def validate_args(args):
-#     if args.system not in available_parsers.keys():
-#         raise ValueError("Unsupported system type. Please select one of {}".format(available_parsers))
+# time format of a selected system when --time_fmt_in is not set, with detected systems
+# the format is inferred from the timestamps of every file instead
+default_time_fmt = "%Y-%m-%d %H:%M:%S"
 
 
 def convert(args):
-    return Convert(available_parsers[args.system], args)
+    if args.system != "auto":
+        return [Convert(available_parsers[args.system], dict(vars(args), time_fmt_in=args.time_fmt_in or default_time_fmt))]
+    # system of every file is detected from its header, files of every detected system
+    # and every directory are converted separately
+    files = FileScanner(args.input, Action.accepted_extensions, recursive=True).scan_files()
+    routes = Detector(available_parsers).classify(files)
+    for file in routes.pop(None, []):
+        print("\tFormat not recognized, skipped: {}".format(file))
+    if len(routes) == 0:
+        raise e.FileFormatError("None of the input files was recognized, please select the --system.")
+    if args.time_fmt_in is not None and len(routes) > 1:
+        raise ValueError("Files of several systems were detected ({}), a single --time_fmt_in can't be used "
+                         "for all of them. Please convert them separately with --system.".format(", ".join(routes)))
+    actions = []
+    for system, system_files in routes.items():
+        experiments = collections.OrderedDict()
+        for file in system_files:
+            experiments.setdefault(os.path.dirname(file), []).append(file)
+        for directory, experiment_files in experiments.items():
+            print("Detected {} in {}: {} files".format(system, directory, len(experiment_files)))
+            actions.append(Convert(available_parsers[system],
+                                   dict(vars(args), system=system, files=experiment_files, time_fmt_in=args.time_fmt_in)))
+    return actions
 
 
 def join(args):
-    return Join(args)
+    return [Join(vars(args))]
 
 
 def match(args):
-    return Match(args)
+    return [Match(vars(args))]
 
 
 def main():
@@ -71,10 +100,34 @@ def main():
                                default="parameter-wide",
                                help="Orientation of output csv file. Can be either with subjects as columns or with " +
                                     "parameters as columns. Only parameter-wide format is accepted by analysis-vis tool.")
+    parent_parser.add_argument('--out_format',
+                               type=str,
+                               choices=("csv", "parquet", "feather"),
+                               default="csv",
+                               help="Format of the exported file. Parquet and feather keep column types and are " +
+                                    "read directly by 'join' and 'match', they require the pyarrow package.")
+    parent_parser.add_argument('--profile',
+                               action='store_true',
+                               help="Store per-stage timings as json and cProfile statistics next to the output. " +
+                                    "Memory allocated within every stage is traced as well, which slows the run down.")
+    parent_parser.add_argument('--compression',
+                               type=str,
+                               choices=("gzip", "zstd"),
+                               help="Compress the exported csv file. Zstd requires the zstandard package.")
+    parent_parser.add_argument('--units',
+                               type=str,
+                               nargs="+",
+                               help="Convert exported parameters to other units, specified as 'parameter=unit' " +
+                                    "pairs, e.g. distance=km feed=mg.")
+    parent_parser.add_argument('--float32',
+                               action='store_true',
+                               help="Keep measured values in single precision to reduce memory use of large experiments.")
     parent_parser.add_argument('--time_fmt_in',
                                type=str,
-                               help="Date-Time format used in source files. Accepts strftime format strings",
-                               default="%Y-%m-%d %H:%M:%S")
+                               help="Date-Time format used in source files. Accepts strftime format strings. " +
+                                    "Default '%%Y-%%m-%%d %%H:%%M:%%S', with --system auto it is inferred from " +
+                                    "the timestamps of every file, files with ambiguous day and month order are " +
+                                    "skipped. Can't be set for files of several systems.")
 
     # ------------------------------------------------------------------------------------------------------------------
     # convert argparse
@@ -83,13 +136,33 @@ def main():
                                            parents=[parent_parser],
                                            help="Converts files to a common specification accepted by activity-vis" +
                                                 " programs as well as 'match' and join' sub-commands.")
-    parser_convert.add_argument('--system', type=str, help="System which was used to record the data",
-                                choices=available_parsers.keys(),
+    parser_convert.add_argument('--system', type=str,
+                                help="System which was used to record the data. Default 'clams-oxymax'. 'auto' " +
+                                     "detects the system of every file from its header and also searches " +
+                                     "subdirectories, every system and directory is converted separately.",
+                                choices=["auto"] + list(available_parsers.keys()),
                                 default="clams-oxymax")
     parser_convert.add_argument('--col_spec',
                                 type=str,
                                 help="Specification file for column specs if custom system is used.")
     parser_convert.add_argument('--regularize', action='store_true', help="Make time series regular")
+    parser_convert.add_argument('--jobs',
+                                type=int,
+                                default=1,
+                                help="Number of processes used to parse input files in parallel. Default 1")
+    parser_convert.add_argument('--mmap',
+                                action='store_true',
+                                help="Memory-map the input files instead of reading them, " +
+                                     "useful for very large exports.")
+    parser_convert.add_argument('--cache',
+                                type=str,
+                                help="Directory of the parse cache. Unchanged input files are loaded from the cache " +
+                                     "instead of being parsed again, requires the pyarrow package.")
+    parser_convert.add_argument('--cache_size',
+                                type=int,
+                                default=1024,
+                                help="Size limit of the parse cache in MB, least recently used files are evicted. " +
+                                     "Default 1024")
     parser_convert.set_defaults(action=convert)
 
     # ------------------------------------------------------------------------------------------------------------------
@@ -130,9 +203,24 @@ def main():
     args = parser.parse_args()
     #validate_args(args)
 
-    act = args.action(args)
-    result = act.run()
-    act.export(result)
+    actions = args.action(args)
+    cprofile = cProfile.Profile() if args.profile else None
+    if cprofile is not None:
+        tracemalloc.start()
+        cprofile.enable()
+    for act in actions:
+        try:
+            result = act.run()
+        except e.FileFormatError as err:
+            # with several detected experiments the others are still converted
+            if len(actions) == 1:
+                raise
+            print("\tExperiment skipped: {} - {}".format(os.path.dirname(act.files[0]), err))
+            continue
+        act.export(result)
+    if cprofile is not None:
+        cprofile.disable()
+    actions[-1].report_profile(cprofile)
 
 if __name__ == "__main__":
     main()
@@ -5,27 +5,41 @@ import string
 import random
 import logging
 from datetime import datetime
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
 from abc import abstractmethod
 from . import errors as e
 from .file_scanner import FileScanner
 from .custom_parser import AnalysisVisParser
 from .col_mapper import ColMapper
-from .datafile import Datafile
+from .datafile import Datafile, validate_frequency
+from .parse_cache import ParseCache, parser_signature
+from . import exporter
+from . import units
+from .profiler import profiler
 
 
 class Action:
 
-    accepted_extensions = ["csv", "txt", "tsv", "asc"]
+    accepted_extensions = ["csv", "txt", "tsv", "asc", "parquet", "feather"]
     metadata_anchor = "[Metadata]"
     data_anchor = "[Data]"
 
     def __init__(self, cmd, datafiles=None):
         self.cmd = cmd
+        validate_frequency(self.cmd.get('frequency'))
         self.parser = None
         # self.scanner = file_scanner.factory_file_scanner(self.cmd.get('input'), Action.accepted_extensions)
         self.scanner = FileScanner(self.cmd.get('input'), Action.accepted_extensions)
-        self.files = self.scanner.scan_files()
+        # files routed to the action by the caller, e.g. after detecting their system
+        self.files = self.cmd.get('files') or self.scanner.scan_files()
         self.common_interval_freq = None
+        self.dtypes = ColMapper.all_dtypes(float32=bool(self.cmd.get('float32')))
+        # units of the exported parameters are checked before any file is parsed
+        self.units = units.parse_units(self.cmd.get('units'))
+        all_units = ColMapper.all_units()
+        for column, unit in self.units.items():
+            units.factor(all_units.get(column, unit), unit)
         logging.basicConfig(filename=self.cmd.get('output') + '/clams-convert.log',
                             level=logging.DEBUG,
                             format='%(message)s')
@@ -53,7 +67,7 @@ class Action:
         if isinstance(source, Datafile):
             self.datafiles.append(source)
         else:
-            self.datafiles.append(Datafile(source))
+            self.datafiles.append(Datafile(source, dtypes=self.dtypes))
         self.find_common_interval()
         return self
 
@@ -85,20 +99,46 @@ class Action:
         return pd.DataFrame(metadata_info.items())
 
     def export(self, datafiles):
+        out_format = self.cmd.get('out_format') or "csv"
+        compression = self.cmd.get('compression')
         for x in datafiles:
             filename = datetime.today().strftime('%Y%m%d') + "_" + \
                        str(random.randint(100, 999)) + "_" + \
-                       type(self).__name__.lower() + ".csv"
-            with open(str(self.cmd.get('output')) + "/" + filename, "w", newline='') as file:
-                file.write(Action.metadata_anchor + "\n")
-                self.create_metadata(dict()).to_csv(file, mode="a", index=False, header=False)
-                file.write(Action.data_anchor + "\n")
-                x.reorient(self.cmd.get('orientation')).export(file)
+                       type(self).__name__.lower() + "." + out_format
+            path = str(self.cmd.get('output')) + "/" + filename
+            metadata = dict()
+            if len(self.units) > 0:
+                x = x.convert_units(self.units, inplace=True)
+                metadata["units"] = ";".join("{}={}".format(k, v) for k, v in self.units.items())
+            metadata = self.create_metadata(metadata)
+            if out_format == "csv":
+                if compression is not None:
+                    path = path + exporter.compressions[compression]
+                with exporter.open_output(path, compression) as file:
+                    file.write(Action.metadata_anchor + "\n")
+                    metadata.to_csv(file, index=False, header=False)
+                    file.write(Action.data_anchor + "\n")
+                    x.export(file, self.cmd.get('orientation'))
+            else:
+                x.export_columnar(path, dict(metadata.values), out_format, self.cmd.get('orientation'))
+
+    def report_profile(self, cprofile=None):
+        # summary of the stage timings, with cprofile the raw stage records and the
+        # cProfile statistics are stored next to the output
+        summary = profiler.summary().to_string(index=False)
+        self.logger.info("Stage profile:\n" + summary)
+        print("\n" + summary)
+        if cprofile is not None:
+            path = str(self.cmd.get('output')) + "/clams-convert"
+            profiler.dump(path + "-profile.json")
+            cprofile.dump_stats(path + ".prof")
+            print("\nProfile was saved to files: {0}-profile.json, {0}.prof".format(path))
+        return self
 
     @staticmethod
     def join_datafiles(datafiles):
         merged = pd.concat([x.data for x in datafiles], axis=0)
-        return Datafile(merged)
+        return Datafile(merged, dtypes=datafiles[0].dtypes)
 
     @staticmethod
     def join_rows(df_list):
@@ -141,50 +181,99 @@ class Action:
 #     def __str__(self):
 #         print(vars(self))
 
+def parse_file(parser, file, cache=None):
+    # module level so that it can be sent to worker processes; the profiler records of
+    # the file are returned with the result as records of a worker don't reach the parent
+    first = len(profiler.records)
+    file, data, err = parse_source(parser, file, cache)
+    return file, data, err, profiler.records[first:]
+
+def parse_source(parser, file, cache=None):
+    try:
+        if cache is None:
+            return file, parser.parse(file), None
+        key = cache.key(file)
+        data = cache.get(key)
+        if data is None:
+            data = parser.parse(file)
+            cache.put(key, data)
+        return file, data, None
+    except (e.FileFormatError, e.SubjectIdError) as err:
+        return file, None, err
+    except (ValueError, UnicodeDecodeError) as err:
+        # malformed content the parser didn't anticipate only skips the file, any other
+        # exception is a bug or a broken environment and aborts the run
+        return file, None, e.FileFormatError("Unexpected error while parsing the file. {}: {}".format(
+            type(err).__name__, err))
+
+
 class Convert(Action):
 
     def __init__(self, parser, *args):
         super().__init__(*args)
-        self.mapper = ColMapper(self.cmd.get('system'))
+        self.mapper = ColMapper(self.cmd.get('system'), float32=bool(self.cmd.get('float32')))
+        self.dtypes = self.mapper.dtypes
         self.parser = parser(self.cmd.get('time_fmt_in'), self.mapper)
+        self.parser.memory_map = bool(self.cmd.get('mmap'))
+        self.errors = dict()
+        self.cache = None
+        if self.cmd.get('cache'):
+            self.cache = ParseCache(self.cmd.get('cache'),
+                                    parser_signature(self.parser),
+                                    int(self.cmd.get('cache_size') or 1024) * 2**20)
 
     def validate(self):
         self.validate_aggregation()
         return self
 
-    # def run_one(self, *args):
-    #     try:
-    #         self.logger.info("Processing: " + self.files[0])
-    #         data = self.parser.parse(self.files[0])
-    #     except (e.FileFormatError, e.SubjectIdError, ValueError) as err:
-    #         raise err
-    #     return [Datafile(data)]
-    #
-    # def run_many(self, *args):
-    #     combined_data = []
-    #     for file in self.files:
-    #         try:
-    #             self.logger.info("Processing: " + file)
-    #             data = self.parser.parse(file)
-    #             combined_data.append(data)
-    #         except (e.FileFormatError, e.SubjectIdError, ValueError) as err:
-    #             raise err
-    #     if self.parser.format_description['multifile'] is True:
-    #         return [Datafile(pd.concat(combined_data, axis=0))]
-    #     else:
-    #         return [Datafile(x) for x in combined_data]
+    def parse_files(self):
+        # files are independent until they are combined, with --jobs they are parsed in
+        # a process pool; results keep the order of self.files and per-file format errors
+        # are collected and reported instead of aborting the whole run
+        jobs = self.cmd.get('jobs') or 1
+        pooled = jobs > 1 and len(self.files) > 1
+        if pooled:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(parse_file, repeat(self.parser), self.files, repeat(self.cache)))
+        else:
+            results = [parse_file(self.parser, x, self.cache) for x in self.files]
+
+        parsed = []
+        for file, data, err, records in results:
+            if pooled:
+                profiler.records.extend(records)
+            self.logger.info("Processing: " + file)
+            if err is None:
+                parsed.append(data)
+            else:
+                self.errors[file] = err
+        self.report_errors()
+        if len(parsed) == 0:
+            raise e.FileFormatError("None of the input files could be parsed.")
+        return parsed
+
+    def report_errors(self):
+        if len(self.errors) > 0:
+            print("\n{} of {} files were skipped:".format(len(self.errors), len(self.files)))
+            for file, err in self.errors.items():
+                self.logger.warning("Skipped: {} - {}".format(file, err))
+                print("\t{} - {}".format(file, err))
+        return self
 
     def run(self, *args):
         print("\nConverting files...\n")
-        if isinstance(self.scanner, file_scanner.IndividualFileScanner):
-            datafile_list = self.run_one(*args)
+        parsed = self.parse_files()
+        if self.parser.format_description['multifile'] is True:
+            datafile_list = [Datafile(pd.concat(parsed, axis=0), dtypes=self.dtypes)]
         else:
-            datafile_list = self.run_many(*args)
+            datafile_list = [Datafile(x, dtypes=self.dtypes) for x in parsed]
+        for x in datafile_list:
+            self.add_datafile(x)
         self.validate()
         if self.cmd.get('regularize'):
             datafile_list = [x.regularize() for x in datafile_list]
         if self.cmd.get('frequency') != 0:
-            datafile_list = [x.aggregate(self.cmd.get('frequency'), how=dict(np.sum)) for x in datafile_list]
+            datafile_list = [x.aggregate(self.cmd.get('frequency'), how=self.mapper.aggregator) for x in datafile_list]
         return datafile_list
 
 
@@ -214,9 +303,10 @@ class Join(Action):
                 raise err
         self.order_datafiles("start_date").validate()
         regularized_datafiles = self.regularize()
-        merged_data = Datafile(pd.concat([x.data for x in regularized_datafiles], axis=0)).regularize()
+        merged_data = Datafile(pd.concat([x.data for x in regularized_datafiles], axis=0),
+                               dtypes=self.dtypes).regularize()
         if self.cmd.get('frequency') != 0:
-            merged_data = merged_data.aggregate(self.cmd.get('frequency'), how=dict(np.sum))
+            merged_data = merged_data.aggregate(self.cmd.get('frequency'))
         # merged_data = Datafile(pd.concat(self.regularize(), axis=0)).regularize()
         return [merged_data]
 
@@ -247,7 +337,7 @@ class Match(Action):
                 # TODO add original filename as suffix to subject name
                 self.logger.info("Processing: " + file)
                 add_letter = next(letters)
-                d = Datafile(file)
+                d = Datafile(file, dtypes=self.dtypes)
                 name_mapping = dict(zip(d.subjects, [x + add_letter for x in d.subjects]))
                 d = d.rename_subjects(name_mapping)
                 self.logger.info(str(file))
@@ -263,11 +353,9 @@ class Match(Action):
 
         matched_datafiles = []
         for d in self.datafiles:
-            # takes dict as aggregation mapping
             # TODO some datafiles can have start some end
             d = d.regularize().remove_incomplete_cycle(self.cmd.get('dark_start'), self.cmd.get('dark_end'))
-            # TODO change to universal mapping
-            d = d.aggregate(str(agg_freq) + 's', dict(distance=np.sum))
+            d = d.aggregate(int(agg_freq))
             matched_datafiles.append(d)
 
         # TODO can also be dark_end
@@ -1,48 +1,192 @@
+import numpy as np
 import pandas as pd
+import glob
 import os
+import functools
+from types import MappingProxyType
+from . import units
 
+# specification files are looked up next to the package, not in the working directory
+specs_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "specs")
 
-class ColMapper:
 
-    def __init__(self, system, file=None):
-        self.system = system
-        self.specs = None
-        self.mapper = None
-        self.finder = None
-        self.typer = None
-        self.no_params = 0
-
-        self.read_specs(file).create()
-
-    def read_specs(self, file):
-        if file is None:
-            self.specs = pd.read_csv("specs/"+self.system+".txt", sep='\t')
-        else:
-            if os.path.exists(file):
-                self.specs = pd.read_csv(file, sep='\t', na_values=['None'])
-            else:
-                raise ValueError("No specification file for columns was found")
-        return self
+def integer_dtype(values, dtype):
+    # dtype, or a wider one of the same kind up to 32 bits, that holds all values
+    # exactly; None if values are missing, fractional or out of range
+    if values.dtype.kind not in "iuf":
+        return None
+    if len(values) == 0:
+        return dtype
+    if values.dtype.kind == "f" and not (np.isfinite(values).all() and (np.trunc(values) == values).all()):
+        return None
+    low, high = values.min(), values.max()
+    kind = np.dtype(dtype).kind
+    for size in (8, 16, 32):
+        candidate = np.dtype(kind + str(size // 8))
+        if candidate.itemsize < np.dtype(dtype).itemsize:
+            continue
+        if np.iinfo(candidate).min <= low and high <= np.iinfo(candidate).max:
+            return candidate
+    return None
+
+def apply_dtypes(data, dtypes):
+    # casts columns of data in place to the dtypes of the plan, columns that cannot be
+    # represented (e.g. counts with gaps after regularization) are left unchanged
+    with pd.option_context('mode.chained_assignment', None):
+        for column, dtype in dtypes.items():
+            if column not in data.columns or data[column].dtype == dtype:
+                continue
+            if dtype == "category":
+                data[column] = data[column].astype(dtype)
+            elif np.dtype(dtype).kind == "M":
+                data[column] = pd.to_datetime(data[column])
+            elif np.dtype(dtype).kind in "iu":
+                fitting = integer_dtype(data[column].to_numpy(), dtype)
+                if fitting is not None:
+                    data[column] = data[column].astype(fitting)
+            elif data[column].dtype.kind in "iuf":
+                data[column] = data[column].astype(dtype)
+    return data
+
+
+def spec_file(system, path=specs_path):
+    return os.path.join(path, system + ".txt")
+
+def read_specs(file):
+    if not os.path.exists(file):
+        raise ValueError("No specification file for columns was found")
+    return pd.read_csv(file, sep='\t', na_values=['None'])
+
+@functools.lru_cache(maxsize=None)
+def compile_schema(file, float32=False):
+    # every specification file is read and compiled only once per process
+    return Schema(read_specs(file), float32)
 
-    def create(self):
+
+class Schema:
+    """Column specification of one system compiled into lookup tables, dtype plan,
+    aggregation rules and expressions of derived columns. Schemas are shared between
+    parsers and files and cannot be changed after they are created, lookup tables are
+    read-only mappings and specs returns a copy of the specification frame."""
+
+    def __init__(self, specs, float32=False):
         try:
-            self.mapper = self.specs.set_index('colnames').loc[:, 'app'].dropna().to_dict()
-            self.finder = self.specs.set_index('app').loc[:, 'colnames'].dropna().to_dict()
-            self.typer = self.specs.set_index('colnames').loc[:, 'type'].dropna().to_dict()
-            self.no_params = len(self.specs["aggregate"].dropna())
+            fields = dict(
+                _specs=specs.copy(),
+                float32=float32,
+                mapper=specs.set_index('colnames').loc[:, 'app'].dropna().to_dict(),
+                finder=specs.set_index('app').loc[:, 'colnames'].dropna().to_dict(),
+                typer=specs.set_index('colnames').loc[:, 'type'].dropna().to_dict(),
+                source_columns=tuple(specs.colnames.dropna()),
+                columns=tuple(specs.app.dropna()),
+                aggregator=specs.set_index('app').loc[:, 'aggregate'].dropna().to_dict(),
+                units=specs.set_index('app').loc[:, 'unit'].dropna().to_dict(),
+                dtypes=ColMapper.dtype_plan(specs, float32),
+                no_params=len(specs["aggregate"].dropna()),
+                # derived columns are optional, custom specification files may omit them
+                derived=specs.set_index('app').loc[:, 'expression'].dropna().to_dict()
+                if 'expression' in specs.columns else dict(),
+            )
         except KeyError:
             print("Incorrect column names in specification file")
             raise
+        self.__dict__.update({k: MappingProxyType(v) if isinstance(v, dict) else v for k, v in fields.items()})
+
+    @property
+    def specs(self):
+        return self._specs.copy()
+
+    def __reduce__(self):
+        # read-only mappings can't be pickled, worker processes compile the specs again
+        return Schema, (self._specs, self.float32)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Schema is immutable, '{}' cannot be set".format(name))
+
+    def __delattr__(self, name):
+        raise AttributeError("Schema is immutable, '{}' cannot be deleted".format(name))
+
+    def derive(self, data):
+        # all derived columns are evaluated in one pass, expressions refer to the app
+        # names of the columns
+        if len(self.derived) == 0:
+            return data
+        return data.eval("\n".join("{} = {}".format(app, expression)
+                                   for app, expression in self.derived.items()))
+
+    def convert_units(self, data, source):
+        # converts columns measured in the source units to the units of the spec
+        return units.convert(data, source, self.units)
+
+
+class ColMapper:
+    """Column specification of a system, attributes are read from the compiled and
+    cached schema of its specification file."""
+
+    def __init__(self, system, file=None, float32=False):
+        self.system = system
+        self.schema = compile_schema(spec_file(system) if file is None else file, float32)
+
+    def __getattr__(self, name):
+        # schema itself is not looked up, e.g. while unpickling in worker processes
+        if name == "schema":
+            raise AttributeError(name)
+        return getattr(self.schema, name)
+
+    @staticmethod
+    def dtype_plan(specs, float32=False):
+        # memory optimized dtypes of app columns, descriptors are added by every parser
+        # even if they are missing in the specs; counts are either marked by their unit
+        # or by the int type of the source column
+        plan = {"subject": "category", "date_time": "datetime64[ns]", "interval": "uint32", "light": "int8"}
+        for app, unit, type in specs.loc[:, ['app', 'unit', 'type']].dropna(subset=['app']).itertuples(index=False):
+            if app in plan:
+                continue
+            elif unit == "[counts]" or type == "int":
+                plan[app] = "uint16"
+            else:
+                plan[app] = "float32" if float32 else "float64"
+        return plan
+
+    @staticmethod
+    def all_schemas(path=specs_path, float32=False):
+        return [compile_schema(file, float32) for file in sorted(glob.glob(os.path.join(path, "*.txt")))]
+
+    @staticmethod
+    def all_specs(path=specs_path):
+        return [x.specs for x in ColMapper.all_schemas(path)]
+
+    @staticmethod
+    def all_aggregators(path=specs_path):
+        # aggregation rules of app columns over every specification file, used when the
+        # original system of a datafile is not known
+        aggregator = dict()
+        for schema in ColMapper.all_schemas(path):
+            aggregator.update(schema.aggregator)
+        return aggregator
+
+    @staticmethod
+    def all_units(path=specs_path):
+        # units of app columns over every specification file, same purpose as all_aggregators
+        all_units = dict()
+        for schema in ColMapper.all_schemas(path):
+            all_units.update(schema.units)
+        return all_units
+
+    @staticmethod
+    def all_dtypes(path=specs_path, float32=False):
+        # dtype plan over every specification file, same purpose as all_aggregators
+        dtypes = dict()
+        for schema in ColMapper.all_schemas(path, float32):
+            dtypes.update(schema.dtypes)
+        return dtypes
+
+    def compact(self, data):
+        return apply_dtypes(data, self.dtypes)
 
     def find(self, name):
         return self.finder[name]
 
-    def update(self, spec, pos):
-        line = pd.DataFrame(spec, index=[pos+0.5])
-        self.specs = self.specs.append(line, ignore_index=False)
-        self.specs = self.specs.sort_index().reset_index(drop=True)
-        self.create()
-
     def validate(self, file):
         #TODO check if all required columns are present after prettify
         pass
@@ -0,0 +1,55 @@
+from . import errors as e
+
+# magic bytes at the start of the supported columnar files
+signatures = {
+    "parquet": b"PAR1",
+    "feather": b"ARROW1",
+}
+
+
+def import_pyarrow():
+    # pyarrow is only required for the binary formats
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.feather
+    except ImportError:
+        raise ImportError("Parquet and feather formats require the 'pyarrow' package.")
+    return pyarrow
+
+
+def detect_format(file):
+    with open(file, "rb") as current_file:
+        head = current_file.read(max(len(x) for x in signatures.values()))
+    for k, v in signatures.items():
+        if head.startswith(v):
+            return k
+    return None
+
+
+def write_table(data, file, metadata, file_format):
+    # metadata block of the csv export is stored as file-level key/value metadata
+    pa = import_pyarrow()
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    schema_metadata = dict(table.schema.metadata or {})
+    schema_metadata.update({str(k).encode(): str(v).encode() for k, v in metadata.items()})
+    table = table.replace_schema_metadata(schema_metadata)
+    if file_format == "parquet":
+        pa.parquet.write_table(table, file)
+    elif file_format == "feather":
+        pa.feather.write_feather(table, file)
+    else:
+        raise ValueError("Unsupported output format: {}".format(file_format))
+
+
+def read_table(file, file_format):
+    pa = import_pyarrow()
+    if file_format == "parquet":
+        table = pa.parquet.read_table(file)
+    elif file_format == "feather":
+        table = pa.feather.read_table(file)
+    else:
+        raise e.FileFormatError("Unsupported input format: {}".format(file_format))
+    metadata = {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items()
+                if k != b"pandas"}
+    return table.to_pandas(), metadata
@@ -1,6 +1,8 @@
 from .file_parser import FileParser
-from .file_parser import rename_subjects, convert_values
+from .file_parser import rename_subjects
 from . import errors as e
+from . import columnar
+from .profiler import profiler
 import pandas as pd
 import numpy as np
 import re
@@ -19,12 +21,26 @@ class AnalysisVisParser(FileParser):
             "data_start": 2
         }
         # TODO this has to inherit from the original parser
-        # format_description = {
-        #     "multifile": False,
-        #     "multiparameter": True
-        # }
-        # self.update_info(**dict(patterns=patterns, offsets=offsets, format_description=format_description))
-        self.update_info(**dict(patterns=patterns, offsets=offsets))
+        format_description = {
+            "multifile": False,
+            "multiparameter": True
+        }
+        self.update_info(**dict(patterns=patterns, offsets=offsets, format_description=format_description))
+        self.metadata = dict()
+
+    def parse(self, file):
+        # parquet and feather exports are read natively, their metadata block is stored
+        # as file-level key/value metadata
+        file_format = columnar.detect_format(file)
+        if file_format is None:
+            return super().parse(file)
+        with profiler.stage("parse") as record:
+            data, self.metadata = columnar.read_table(file, file_format)
+            record["rows"] = len(data)
+        if self.metadata.get("filetype") != self.patterns["file_type"]:
+            raise e.FileFormatError("Format not recognized, {} file is not an {} file.".format(
+                file_format, self.patterns["file_type"]))
+        return data
 
     def parse_subject_names(self, text):
         pass
@@ -32,7 +48,7 @@ class AnalysisVisParser(FileParser):
     def prettify(self, data, *args):
         # when parsed from records, types are not set correctly
         # data = data.infer_objects()
-        data.date_time = pd.to_datetime(data.date_time)
+        data.date_time = self.format_ts(data.date_time)
         data.interval = pd.to_numeric(data.interval)
         desc = ["subject", "date_time", "interval"]
         data = pd.concat([data.loc[:, desc], data.drop(columns=desc).apply(pd.to_numeric)], axis=1)
@@ -54,12 +70,11 @@ class ClamsOxymaxParser(FileParser):
             "data_start": 5,
             "data_end": 0
         }
-        # format_description = {
-        #     "multifile": True,
-        #     "multiparameter": True
-        # }
-        # self.update_info(**dict(patterns=patterns, offsets=offsets, format_description=format_description))
-        self.update_info(**dict(patterns=patterns, offsets=offsets))
+        format_description = {
+            "multifile": True,
+            "multiparameter": True
+        }
+        self.update_info(**dict(patterns=patterns, offsets=offsets, format_description=format_description))
 
     def parse_subject_names(self, text):
         subject_id = text[self.line_numbers['subject']]
@@ -70,14 +85,12 @@ class ClamsOxymaxParser(FileParser):
 
     def prettify(self, data, subjects, *args):
         colfind = self.mapper.find
-        data = data.filter(self.mapper.specs.colnames.dropna())
-        data = data.astype(self.mapper.typer)
 
         # reformat subject ID column
         data['subject'] = subjects
 
         # match the date/time format of shiny_app
-        data.loc[:, colfind("date_time")] = self.format_ts(data.loc[:, colfind("date_time")])
+        data[colfind("date_time")] = self.format_ts(data[colfind("date_time")])
         data.loc[:, colfind('light')] = data.loc[:, colfind('light')].apply(lambda x: 1 if x == "ON" else 0)
 
         # set float precision for heat and rer values
@@ -85,12 +98,9 @@ class ClamsOxymaxParser(FileParser):
         for param in ['feed', 'drink', 'heat', 'rer']:
             data[colfind(param)] = data[colfind(param)].round(6)
 
-        data['xyt'] = data[colfind('xt')] + data[colfind('yt')]
-        data['xf'] = data[colfind('xt')] - data[colfind('xa')]
-        data['yf'] = data[colfind('yt')] - data[colfind('ya')]
-
         data = data.rename(columns=self.mapper.mapper)
-        data = data[self.mapper.specs.app.dropna()]
+        data = self.mapper.derive(data)
+        data = data[list(self.mapper.columns)]
 
         return data
 
@@ -109,63 +119,58 @@ class ClamsTseParser(FileParser):
             "data_start": 2,
             "data_end": 0
         }
-        # format_description = {
-        #     "multifile": False,
-        #     "multiparameter": True
-        # }
-        # self.update_info(**dict(patterns=patterns, offsets=offsets, format_description=format_description))
-        self.update_info(**dict(patterns=patterns, offsets=offsets))
+        format_description = {
+            "multifile": False,
+            "multiparameter": True
+        }
+        self.update_info(**dict(patterns=patterns, offsets=offsets, format_description=format_description))
+        self.na_values = ['-']
 
     def parse_subject_names(self, text):
         pass
 
-    def prettify(self, data, *args):
+    def transform(self, data):
+        # all per-subject operations in one pass over groups of the subject column:
+        # feed and drink are reported as cumulative in the tse, have to be changed to
+        # interval otherwise the aggregation will not work, gaps are interpolated
+        # within every subject and the first observation of every subject, which has
+        # no previous value to compute the interval from, is dropped
         colfind = self.mapper.find
+        subject = data[colfind('subject')]
+        groups = data.groupby(subject, sort=False)
+        for param in ['feed', 'drink']:
+            data[colfind(param)] = groups[colfind(param)].diff()
+
+        columns = [x for x in data.select_dtypes("number").columns
+                   if x != colfind('subject') and data[x].hasnans]
+        # rows of the animals can be interleaved, so gaps are interpolated only from
+        # observations of the same subject
+        data[columns] = data[columns].groupby(subject, sort=False).transform(lambda x: x.interpolate())
+
+        data = data[groups.cumcount().to_numpy() > 0]
+        data.insert(1, "interval", data.groupby(data[colfind('subject')], sort=False).cumcount())
+        return data
 
-        data.replace('-', np.NaN, inplace=True)
-        data = data.astype(self.mapper.typer)
-
-        # feed and drink are reported as cumulative in the tse, have to be changed to interval
-        # otherwise the aggregation will not work
-        data[colfind('feed')] = data[colfind('feed')].diff()
-        data[colfind('drink')] = data[colfind('drink')].diff()
-
-        data = data.interpolate(axis=0)
-        # TODO this has to be moved
-        data.drop(data.index[:1], inplace=True)
-
-        data["DateTime"] = data["Date"] + " " + data["Time"]
-        self.mapper.update({"display": "Date-Time",
-                            "app": "date_time",
-                            "unit": None,
-                            "aggregate": None,
-                            "colnames": "DateTime"}, 0)
-        data.loc[:, colfind("date_time")] = self.format_ts(data.loc[:, colfind("date_time")])
-        data.loc[:, colfind('light')] = data.loc[:, colfind('light')].apply(lambda y: 1 if y > 50 else 0)
+    def prettify(self, data, *args):
+        colfind = self.mapper.find
+        data = self.transform(data)
+        data[colfind('light')] = (data[colfind('light')] > 50).astype(int)
 
         # set float precision for heat and rer values
         # when read from csv they are jumbled due to imprecise float precision
         for param in ['feed', 'drink', 'heat', 'rer']:
             data[colfind(param)] = data[colfind(param)].round(6)
 
-        ser = []
-        interval_count = list(data.groupby(colfind('subject')).count()[colfind("date_time")])
-        for x in interval_count:
-            ser = ser + list(range(0, x))
-        data.insert(1, "interval", ser)
-        self.mapper.update({"display": "Interval",
-                            "app": "interval",
-                            "unit": None,
-                            "aggregate": None,
-                            "colnames": "DateTime"}, 0)
-
         # events have been disabled for now, they don't seem to bring anything useful
         # insert and Event Log column and initialize with empty string
         #    data["events"] = ""
 
-        # unify and reorder columns according to common specs
+        # unify and reorder columns according to common specs, date and time are
+        # reported in separate columns
         data = data.rename(columns=self.mapper.mapper)
-        data = data[self.mapper.specs.app.dropna()]
+        data["date_time"] = self.format_ts(data["Date"] + " " + data["Time"])
+        data = self.mapper.derive(data)
+        data = data[list(self.mapper.columns)]
 
         return data
 
@@ -181,14 +186,13 @@ class FwrZierathOldParser(FileParser):
         offsets = {
             "data_start": 1
         }
-        # format_description = {
-        #     "multifile": False,
-        #     "multiparameter": False
-        # }
-        # self.update_info(**dict(patterns=patterns, offsets=offsets, format_description=format_description))
-        self.update_info(**dict(patterns=patterns, offsets=offsets))
-
-        self.turns_conversion_factor = 0.6912
+        format_description = {
+            "multifile": False,
+            "multiparameter": False
+        }
+        self.update_info(**dict(patterns=patterns, offsets=offsets, format_description=format_description))
+        # wheel turns are converted to the units of the spec
+        self.source_units = {"distance": "[turns]"}
 
     def parse_subject_names(self, text):
         subject_ids = text[self.line_numbers['subject']]
@@ -197,28 +201,50 @@ class FwrZierathOldParser(FileParser):
         subject_ids = [x.split(' ')[0] for x in subject_ids]
         return subject_ids
 
+    @staticmethod
+    def column_layout(columns, subjects):
+        # positions of the date, time and turns columns of every subject, columns are
+        # named '<subject> <group> Turns Date|Time|Data'
+        fields = {"Turns Date": "date", "Turns Time": "time", "Turns Data": "turns"}
+        layout = {x: dict() for x in subjects}
+        for i, column in enumerate(columns):
+            subject = column.split(' ')[0]
+            for suffix, field in fields.items():
+                if subject in layout and column.endswith(suffix) and field not in layout[subject]:
+                    layout[subject][field] = i
+        missing = [x for x, y in layout.items() if len(y) != len(fields)]
+        if len(missing) > 0:
+            raise e.FileFormatError("Turns columns are missing for subjects: " + ", ".join(missing))
+        return layout
+
     def prettify(self, data, subjects, *args):
-        df_list = []
+        layout = self.column_layout(data.columns, subjects)
+        values = data.to_numpy()
+        rows = len(values)
+
+        # subjects recorded by the same clock share their timestamps, every distinct
+        # clock is parsed only once
+        clocks = dict()
+        timestamps = []
         for subject in subjects:
-            data_sub = data.filter(regex=subject, axis=1)
-            date = data_sub.filter(regex='Turns Date').iloc[:, 0]
-            time = data_sub.filter(regex='Turns Time').iloc[:, 0]
-            turns = data_sub.filter(regex='Turns Data').iloc[:, 0]
-            turns.name = 'distance'
-            turns = turns.astype(float)
-            turns = convert_values(turns, self.turns_conversion_factor)
-            date_time = date + " " + time
-            date_time = self.format_ts(date_time)
-            data_subject_concat = pd.concat([pd.Series([subject]*len(date_time), name='subject'),
-                                             date_time,
-                                             pd.Series(range(len(date_time)), name='interval'),
-                                             turns],
-                                            axis=1)
-            # data_subject_concat.columns = ["subject", "date_time", "interval", "distance"]
-            df_list.append(data_subject_concat)
-
-        df = pd.concat(df_list, axis=0)
-        return df
+            key = (layout[subject]["date"], layout[subject]["time"])
+            for other, parsed in clocks.items():
+                if np.array_equal(values[:, other[0]], values[:, key[0]]) and \
+                        np.array_equal(values[:, other[1]], values[:, key[1]]):
+                    key = other
+                    break
+            if key not in clocks:
+                clocks[key] = self.format_ts(pd.Series(values[:, key[0]] + " " + values[:, key[1]])).to_numpy()
+            timestamps.append(clocks[key])
+
+        turns = values[:, [layout[x]["turns"] for x in subjects]].astype(float)
+        df = pd.DataFrame({
+            "subject": np.repeat(np.asarray(subjects, dtype=object), rows),
+            "date_time": np.concatenate(timestamps) if len(timestamps) > 0 else np.array([], dtype="datetime64[ns]"),
+            "interval": np.tile(np.arange(rows), len(subjects)),
+            "distance": turns.ravel(order="F"),
+        })
+        return self.mapper.convert_units(df, self.source_units)
 
 class FwrZierathParser(FileParser):
 
@@ -232,16 +258,23 @@ class FwrZierathParser(FileParser):
         offsets = {
             "data_start": 1
         }
-        # format_description = {
-        #     "multifile": False,
-        #     "multiparameter": False
-        # }
-        # self.update_info(**dict(patterns=patterns, offsets=offsets, format_description=format_description))
-        self.update_info(**dict(patterns=patterns, offsets=offsets))
-        self.turns_conversion_factor = 0.6912
+        format_description = {
+            "multifile": False,
+            "multiparameter": False
+        }
+        self.update_info(**dict(patterns=patterns, offsets=offsets, format_description=format_description))
+        # wheel turns are converted to the units of the spec
+        self.source_units = {"distance": "[turns]"}
 
     def parse_subject_names(self, text):
-        subjects = ','.join(text[self.line_numbers['subject']:self.line_numbers['data_start']]).split(',')[1:]
+        lines = [x.strip() for x in text[self.line_numbers['subject']:self.line_numbers['data_start']]]
+        subjects = lines[0].split(',')[1:]
+        for line in lines[1:]:
+            names = line.split(',')
+            # long group lines are wrapped, the continuation repeats the last name
+            if len(subjects) > 0 and names[0] == subjects[-1]:
+                names = names[1:]
+            subjects = subjects + names
         subjects = [re.sub(" ", "_", x) for x in subjects]
         return subjects
 
@@ -253,13 +286,12 @@ class FwrZierathParser(FileParser):
         turns_only = data.iloc[:, 1:len(subjects) + 1]
         turns_only.columns = subjects
         turns_only = turns_only.astype(float)
-        turns_only = FileParser.convert_values(turns_only, self.turns_conversion_factor)
 
         df = pd.concat([date_time, pd.Series(range(len(date_time)), name='interval'), turns_only], axis=1)
         df = df.melt(id_vars=["date_time", "interval"], var_name="subject", value_name="distance")
         df = df[["subject", "date_time", "interval", "distance"]]
 
-        return df
+        return self.mapper.convert_units(df, self.source_units)
 
 class FwrCanlonParser(FileParser):
 
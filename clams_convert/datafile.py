@@ -1,13 +1,21 @@
 import numpy as np
 import pandas as pd
 import collections
-import traces
 import os
+import math
 import logging
-from datetime import timedelta, datetime, time, date
+import functools
+from datetime import timedelta, datetime, time
 from .custom_parser import AnalysisVisParser
+from .col_mapper import ColMapper, apply_dtypes
+from . import columnar
+from . import exporter
+from . import units
+from .profiler import profiled
 from . import errors as e
 
+NAT = np.datetime64("NaT").view("int64")
+
 def round_minutes(dt, how="up"):
     if how == "up":
         return dt + timedelta(seconds=(60-dt.second))
@@ -25,25 +33,50 @@ def str_to_time(time_string, sep=":"):
 def freq_to_seconds(freq):
     return int(freq.total_seconds())
 
-def create_parameter_ts(df, parameter):
-    # TODO casting all to float might not work
-    ts = traces.TimeSeries(dict(zip(df.date_time, df[parameter].astype(float))))
-    return ts
-
-def traces_to_pandas(ts_dict):
-    per_subject = []
-    for s, subjects in ts_dict.items():
-        per_param = []
-        for p, parameter in subjects.items():
-            param_df = pd.DataFrame(parameter).set_index(0)
-            param_df.index.name = "date_time"
-            param_df.columns = [p]
-            per_param.append(param_df)
-        subject_df = pd.concat(per_param, axis=1).reset_index()
-        subject_df.insert(1, "interval", list(range(len(subject_df.index))))
-        subject_df.insert(0, "subject", s)
-        per_subject.append(subject_df)
-    return pd.concat(per_subject, axis=0)
+def regularize_frame(data, parameters, start, end, freq):
+    # linear interpolation of all parameters of all subjects onto a common time grid
+    # in one batched pass; like traces.TimeSeries.sample(interpolate='linear') grid
+    # points before the first observation of a subject are NaN and after the last one
+    # hold its value, light is carried over from the previous observation
+    data = data.sort_values(["subject", "date_time"], kind="mergesort")
+    data = data.drop_duplicates(["subject", "date_time"], keep="last")
+    codes, subjects = pd.factorize(data.subject, sort=True)
+    times = data.date_time.values.astype("int64")
+    grid = np.arange(pd.Timestamp(start).value, pd.Timestamp(end).value + 1,
+                     freq * 10**9, dtype="int64")
+
+    # subjects are laid out one after another on a single integer time axis so that
+    # one searchsorted call locates the neighbours of every grid point
+    origin = min(times.min(), grid[0])
+    span = max(times.max(), grid[-1]) - origin + 1
+    if int(span) * len(subjects) >= 2**63:
+        raise ValueError("Time range of the experiment is too long to be regularized.")
+    keys = codes * span + (times - origin)
+    grid_codes = np.repeat(np.arange(len(subjects)), len(grid))
+    grid_keys = grid_codes * span + np.tile(grid - origin, len(subjects))
+
+    right = np.searchsorted(keys, grid_keys, side="right")
+    left = right - 1
+    first = np.searchsorted(codes, grid_codes, side="left")
+    last = np.searchsorted(codes, grid_codes, side="right")
+    before = left < first
+    after = right >= last
+    inner = ~(before | after)
+
+    values = data[parameters].to_numpy(dtype=float)
+    result = np.full((len(grid_keys), len(parameters)), np.nan)
+    result[after] = values[last[after] - 1]
+    l, r = left[inner], right[inner]
+    scale = (grid_keys[inner] - keys[l]) / (keys[r] - keys[l])
+    result[inner] = values[l] + scale[:, None] * (values[r] - values[l])
+
+    regular = pd.DataFrame(result, columns=parameters)
+    regular.insert(0, "subject", subjects.values[grid_codes])
+    regular.insert(1, "date_time", np.tile(grid, len(subjects)).view("datetime64[ns]"))
+    regular.insert(2, "interval", np.tile(np.arange(len(grid)), len(subjects)))
+    if "light" in data.columns:
+        regular.insert(3, "light", data.light.values[np.clip(left, first, last - 1)])
+    return regular
 
 def create_datetime_series(self, start_date, start_time, periods, freq):
     start = datetime.strptime(start_date + " " + start_time, "%Y-%m-%d %H:%M:%S")
@@ -64,56 +97,126 @@ def divisible(arr, a):
     a = int(a)
     return [int(x) for x in arr if int(x)%a == 0]
 
+def prime_factors(n):
+    factors = collections.Counter()
+    i = 2
+    while i * i <= n:
+        while n % i == 0:
+            factors[i] += 1
+            n //= i
+        i += 1
+    if n > 1:
+        factors[n] += 1
+    return factors
+
+def divisors(n):
+    # all divisors of n in ascending order, built from its prime factorization
+    result = [1]
+    for prime, power in prime_factors(int(n)).items():
+        result = [x * prime ** k for x in result for k in range(power + 1)]
+    return sorted(result)
+
+@functools.lru_cache(maxsize=None)
+def allowed_agg_frequencies(phase1, phase2, freq):
+    # aggregation frequencies in seconds that are multiples of the measurement frequency
+    # and don't split any of the two light phases, i.e. divisors of their gcd
+    phase1, phase2, freq = int(phase1), int(phase2), int(freq or 0)
+    if phase1 <= 0 or phase2 <= 0 or freq <= 0:
+        return ()
+    return tuple(x for x in divisors(math.gcd(phase1, phase2)) if x % freq == 0)
+
+def validate_frequency(frequency, cycle=timedelta(hours=24)):
+    # checks the requested aggregation frequency before any data is read, the light
+    # phases add up to the cycle so every allowed frequency has to divide it
+    if frequency is None or frequency == 0:
+        return frequency
+    if frequency < 0 or freq_to_seconds(cycle) % frequency != 0:
+        raise e.AggregationFrequencyError("Illegal frequency {} s, only frequencies that divide ".format(frequency) +
+                                          "the {} s light cycle are allowed.".format(freq_to_seconds(cycle)))
+    return frequency
+
 
 #TODO light as parameter or descriptor?
 # problems with interpolation during traces
 class Datafile:
 
-    def __init__(self, datafile, dark_start = None, dark_end = None, force_regularize=True):
-        self.parser = AnalysisVisParser("%Y-%m-%d %H:%M:%S")
+    # attributes derived from the data and the init method that sets them, they are
+    # computed on first access and handed over to derived datafiles when known
+    lazy_attributes = {
+        "num_observations": "init_num_observations",
+        "parameters": "init_parameters",
+        "start_date": "init_start_end_date",
+        "end_date": "init_start_end_date",
+        "phase_change_indices": "init_phase_changes",
+        "phase_change_dates": "init_phase_changes",
+        "phase_changes": "init_phase_changes",
+        "subject_freq": "init_freq",
+        "freq": "init_freq",
+        "regular": "init_freq",
+        "allowed_agg_freq": "init_allowed_agg_freq",
+    }
+
+    def __init__(self, datafile, dark_start = None, dark_end = None, force_regularize=True,
+                 regularization_method="interpolate", freq_sample=None, dtypes=None):
+        self.parser = AnalysisVisParser()
         self.id = None
-        self.start_date = None
-        self.end_date = None
         self.dark_start = dark_start
         self.dark_end = dark_end
-        self.phase_change_indices = tuple()
-        self.phase_change_dates = tuple()
-        self.subject_freq = dict()
-        self.freq = None
-        self.allowed_agg_freq = None
-        self.regular = True
         self.force_regularize = force_regularize
+        # number of intervals per subject used to detect frequency, None for all
+        self.freq_sample = freq_sample
         # None, nudge or interpolate
         # TODO implement nudge
         self.regularization_method = regularization_method
         self.initialized = False
-        self.num_observations = dict()
         self.subjects = []
         self.descriptors = ["subject", "date_time", "interval"]
         self.light_column = ["light"]
-        self.parameters = []
         self.data = None
-        self.subject_split_data = collections.OrderedDict()
+        self.subject_ranges = collections.OrderedDict()
+        # dtype plan applied to the data of this datafile and of every datafile derived
+        # from it, defaults to the plan of all specification files
+        self.dtypes = ColMapper.all_dtypes() if dtypes is None else dtypes
         self.logger = logging.getLogger('clams-convert')
         self.__create(datafile)
 
+    def __getattr__(self, name):
+        # only called when the attribute is not set yet
+        if name not in Datafile.lazy_attributes:
+            raise AttributeError("'Datafile' object has no attribute '{}'".format(name))
+        getattr(self, Datafile.lazy_attributes[name])()
+        return self.__dict__[name]
+
+    def known_attributes(self, *names):
+        return {x: self.__dict__[x] for x in names if x in self.__dict__}
+
+    def derive(self, data, **invariants):
+        # datafile of transformed data, attributes that the transformation is known to
+        # keep are handed over instead of being computed again from the data
+        datafile = Datafile(data, self.dark_start, self.dark_end, self.force_regularize,
+                            self.regularization_method, self.freq_sample, dtypes=self.dtypes)
+        datafile.__dict__.update(invariants)
+        return datafile
+
     def __create(self, source):
         if isinstance(source, str):
             if os.path.exists(source):
                 self.data = self.parser.parse(source)
         elif isinstance(source, pd.DataFrame):
             self.data = source
-            self.data.date_time = pd.to_datetime(self.data.date_time,
-                                                 format="%Y-%m-%d %H:%M:%S")
+            if not pd.api.types.is_datetime64_any_dtype(self.data.date_time):
+                self.data.date_time = pd.to_datetime(self.data.date_time,
+                                                     format="%Y-%m-%d %H:%M:%S")
         else:
             raise ValueError("Datafile source is of unrecognized type, " +
                 "only path and DataFrame are accepted.")
+        apply_dtypes(self.data, self.dtypes)
         self.__initialize()
         return self
 
     def init_start_end_date(self, round_mins=True):
-        self.start_date = sorted(self.data.date_time)[0]
-        self.end_date = sorted(self.data.date_time)[-1]
+        self.start_date = self.data.date_time.min()
+        self.end_date = self.data.date_time.max()
         if round_mins:
             self.start_date = round_minutes(self.start_date)
             self.end_date = round_minutes(self.end_date)
@@ -121,15 +224,36 @@ class Datafile:
     def init_subjects(self, rename_subject_mapping):
         if rename_subject_mapping is not None:
             self.rename_subjects(rename_subject_mapping)
-        self.subjects = list(set(self.data.subject.tolist()))
-        for s in self.subjects:
-            self.subject_split_data[s] = self.data.query('subject == @s')
+        # rows are ordered by subject and time with one sort on the categorical codes,
+        # subjects are then addressed by row ranges instead of per-subject copies
+        with pd.option_context('mode.chained_assignment', None):
+            self.data.subject = self.data.subject.astype("category")
+        codes = self.data.subject.cat.codes.to_numpy()
+        times = self.data.date_time.to_numpy()
+        step = np.diff(codes)
+        if np.any((step < 0) | ((step == 0) & (np.diff(times) < np.timedelta64(0)))):
+            order = np.lexsort((times, codes))
+            self.data = self.data.iloc[order].reset_index(drop=True)
+            codes = codes[order]
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        starts = np.concatenate([[0], bounds]) if len(codes) > 0 else np.array([], dtype=int)
+        stops = np.concatenate([bounds, [len(codes)]]) if len(codes) > 0 else np.array([], dtype=int)
+        self.subjects = list(self.data.subject.cat.categories[codes[starts]])
+        self.subject_ranges = collections.OrderedDict(zip(self.subjects, zip(starts, stops)))
+
+    @property
+    def subject_split_data(self):
+        # zero-copy row slices of self.data for every subject
+        return collections.OrderedDict((k, self.data.iloc[a:b]) for k, (a, b) in self.subject_ranges.items())
+
+    def subject_row_positions(self):
+        # position of every row within its subject
+        starts = np.array([a for a, b in self.subject_ranges.values()], dtype=int)
+        lengths = np.array([b - a for a, b in self.subject_ranges.values()], dtype=int)
+        return np.arange(lengths.sum()) - np.repeat(starts, lengths)
 
     def init_num_observations(self):
-        try:
-            self.num_observations = {k: s.shape[0] for (k, s) in self.subject_split_data.items()}
-        except ValueError:
-            print("Subject data not initialized.")
+        self.num_observations = {k: int(b - a) for k, (a, b) in self.subject_ranges.items()}
 
     def init_parameters(self):
         self.parameters = self.get_parameters()
@@ -146,39 +270,57 @@ class Datafile:
             self.data['light'] = pd.Series(np.where(ts >= ds and ts < de, 0, 1))
 
     def init_phase_changes(self):
-        if self.data['light'].iloc[0] == 0:
-            next_phase = 1
-        elif self.data['light'].iloc[0] == 1:
-            next_phase = 0
-        else:
+        # every light transition of every subject in one vectorized change point search,
+        # indices and dates of the first subject are used to find the cycle durations
+        if 'light' not in self.data.columns:
+            self.init_light_column()
+        light = self.data['light'].to_numpy()
+        if not np.isin(light, (0, 1)).all():
             raise ValueError("Illegal value in the light column, only 0 and 1 are permitted.")
-        i1 = list(self.data['light']).index(next_phase)
-        i2 = list(self.data['light'].iloc[(i1+1):]).index(1-next_phase)
-        self.phase_change_indices = (i1, i2)
-        self.phase_change_dates = (self.data.date_time.iloc[i1],
-                                   self.data.date_time.iloc[i2])
+        codes = self.data.subject.cat.codes.to_numpy()
+        rows = np.flatnonzero((np.diff(light) != 0) & (codes[1:] == codes[:-1])) + 1
+        self.phase_changes = pd.DataFrame({
+            "subject": self.data.subject.to_numpy()[rows],
+            "row": rows,
+            "date_time": self.data.date_time.to_numpy()[rows],
+            "light": light[rows]})
+        first = rows[codes[rows] == codes[0]] if len(codes) > 0 else rows
+        self.phase_change_indices = tuple(int(x) for x in first)
+        self.phase_change_dates = tuple(self.data.date_time.iloc[first])
 
     def init_freq(self):
+        self.freq = None
+        self.regular = True
+        self.subject_freq = dict()
         try:
-            interval_lengths = self.subject_interval_lengths()
+            interval_lengths = self.subject_interval_lengths(self.freq_sample)
             subject_freq = self.find_freq(interval_lengths)
             self.validate_freq(subject_freq)
+            self.subject_freq = subject_freq
             self.freq = freq_to_seconds(list(set(subject_freq.values()))[0])
-        except ValueError:
-            print("Subject data not initialized.")
+        except (ValueError, IndexError):
+            self.logger.warning("Measurement frequency could not be detected.")
 
 
     def init_allowed_agg_freq(self):
-        phase1_duration = self.phase_change_dates[1] - self.phase_change_dates[0]
+        self.allowed_agg_freq = []
+        try:
+            phase_change_dates = self.phase_change_dates
+        except ValueError as err:
+            self.logger.warning("Phase changes could not be detected, aggregation is disabled. " + str(err))
+            return
+        if len(phase_change_dates) < 2:
+            self.logger.warning("Experiment doesn't contain a complete light phase, aggregation is disabled.")
+            return
+        phase1_duration = phase_change_dates[1] - phase_change_dates[0]
         phase2_duration = timedelta(hours=24) - phase1_duration
-        common_agg = find_common_divisors(phase1_duration.total_seconds(),
-                                          phase2_duration.total_seconds())
-        self.allowed_agg_freq = divisible(common_agg, self.freq)
+        self.allowed_agg_freq = list(allowed_agg_frequencies(phase1_duration.total_seconds(),
+                                                             phase2_duration.total_seconds(), self.freq))
 
     def get_parameters(self):
         t = list(self.data.columns)
         _ = [t.remove(x) for x in self.descriptors]
-        _ = [t.remove(x) for x in self.light_column]
+        _ = [t.remove(x) for x in self.light_column if x in t]
         return t
 
     # Block of initialize and initialize-related functions
@@ -201,17 +343,30 @@ class Datafile:
         # else:
         #     return Datafile(self.data).rename_subjects(a, inplace=True)
 
-    def subject_interval_lengths(self):
-        interval_lengths = dict()
-        for subject, data in self.subject_split_data.items():
-            date_column = data.date_time #pd.to_datetime(data.date_time)
-            count_intervals = collections.Counter(date_column.diff())
-            count_intervals.pop(pd.NaT, None)
-            interval_lengths[subject] = count_intervals
+    def subject_interval_lengths(self, sample=None):
+        # counts of interval lengths per subject from int64 nanosecond diffs, with sample
+        # set only the first sample intervals of every subject are considered
+        times = self.data.date_time.to_numpy().view("int64")
+        codes = self.data.subject.cat.codes.to_numpy()
+        valid = (codes[1:] == codes[:-1]) & (times[1:] != NAT) & (times[:-1] != NAT)
+        if sample is not None:
+            valid &= self.subject_row_positions()[1:] <= sample
+        diffs = (times[1:] - times[:-1])[valid]
+        codes = codes[1:][valid]
+
+        # intervals are ranked globally so that one unique call counts them per subject
+        lengths, rank = np.unique(diffs, return_inverse=True)
+        pairs, counts = np.unique(codes.astype("int64") * len(lengths) + rank, return_counts=True)
+        categories = self.data.subject.cat.categories
+        interval_lengths = {s: collections.Counter() for s in self.subjects}
+        for pair, count in zip(pairs, counts):
+            subject = categories[pair // len(lengths)]
+            interval_lengths[subject][pd.Timedelta(int(lengths[pair % len(lengths)]))] = int(count)
         return interval_lengths
 
     def find_freq(self, interval_lengths):
         subject_freq = dict()
+        self.regular = True
         for k, v in interval_lengths.items():
             if len(v) > 1 and not self.force_regularize:
                 raise ValueError("The time series for {} is not regular ".format(k) +
@@ -226,7 +381,6 @@ class Datafile:
                 self.regular = False
             else:
                 subject_freq[k] = v.most_common(1)[0][0]
-                self.regular = True
         return subject_freq
 
     def validate_freq(self, subject_freq):
@@ -241,20 +395,13 @@ class Datafile:
         except ValueError:
             ("No measurement intervals detected in data file.")
 
-    def __initialize(self, rename_subject_mapping=None, round_mins=True, **kwargs):
-        try: # if self.data is not None:
-            self.init_subjects(rename_subject_mapping)
-            self.init_num_observations()
-            self.init_parameters()
-            self.init_start_end_date(round_mins)
-            if self.data['light'] is None:
-                self.init_light_column()
-            self.init_phase_changes()
-            self.init_freq()
-            self.init_allowed_agg_freq()
-        # TODO I dont know if this will work
-        except ValueError:
-            print("Experiment doesn't contain any data to initialize from.")
+    @profiled("initialize")
+    def __initialize(self, rename_subject_mapping=None, **kwargs):
+        # subjects define the row layout and are set up right away, the rest of the
+        # derived attributes is computed lazily
+        for x in Datafile.lazy_attributes:
+            self.__dict__.pop(x, None)
+        self.init_subjects(rename_subject_mapping)
         self.initialized = True
         return self
 
@@ -264,10 +411,11 @@ class Datafile:
     def equalize_observations(self, remove_from_end = True):
         o = min(self.num_observations.values())
         if remove_from_end:
-            filtered_data = {k: s[0:o] for (k, s) in self.subject_split_data.items()}
+            rows = [np.arange(a, a + o) for a, b in self.subject_ranges.values()]
         else:
-            filtered_data = {k: s[(len(s)-o):len(s)] for (k, s) in self.subject_split_data.items()}
-        return Datafile(pd.concat(filtered_data.values(), axis=0))
+            rows = [np.arange(b - o, b) for a, b in self.subject_ranges.values()]
+        return self.derive(self.data.iloc[np.concatenate(rows)].reset_index(drop=True),
+                           **self.known_attributes("freq", "regular", "subject_freq"))
 
     def remove_incomplete_cycle(self, remove_from_end = True):
         if self.first_phase_change == self.start_data:
@@ -277,75 +425,147 @@ class Datafile:
             for k, s in self.subject_split_data.items():
                 tmp = s[s.date_time >= self.first_phase_change]
                 filtered_data[k] = tmp
-            return Datafile(pd.concat(filtered_data, axis=0)).equalize_observations(remove_from_end)
+            return Datafile(pd.concat(filtered_data, axis=0), dtypes=self.dtypes).equalize_observations(remove_from_end)
 
+    @profiled("regularize")
     def regularize(self, inplace=False):
         if not self.freq:
             raise ValueError("Measurement frequency of dataset has not been set." +
                 " Please run 'validate' first.")
         if not self.regular:
             self.logger.info("Regularizing on frequency {}".format(self.freq))
-            results = dict()
-            for i, s in self.subject_split_data.items():
-                results[i] = dict()
-                for p in self.parameters:
-                    ts = create_parameter_ts(s, p)
-                    ts_reg = ts.sample(
-                        sampling_period=timedelta(seconds=self.freq),
-                        start=self.start_date,
-                        end=self.end_date,
-                        interpolate='linear',
-                    )
-                    results[i][p] = ts_reg
+            regular_data = regularize_frame(self.data, self.parameters, self.start_date,
+                                            self.end_date, self.freq)
             if inplace:
-                self.data = traces_to_pandas(results).__initialize()
+                self.data = apply_dtypes(regular_data, self.dtypes)
+                self.__initialize()
                 return self
             else:
-                return Datafile(traces_to_pandas(results))
+                return self.derive(regular_data, freq=self.freq, regular=True,
+                                   subject_freq={k: pd.Timedelta(seconds=self.freq) for k in self.subjects})
         else:
             return self
 
     # TODO
-    # use different functions for different parameters - add aggregator to col_mapper
-    # light aggregated min, max or maybe median - should not matter if phases are preserved
     # does not center on phase change
-    def aggregate(self, new_freq, how):
+    @profiled("aggregate")
+    def aggregate(self, new_freq, how=None):
+        # all subjects are aggregated in one groupby over integer bin indices counted
+        # from the first observation of every subject; how maps parameters to their
+        # aggregator, defaults to the rules of the column specification files
+        if isinstance(new_freq, str):
+            new_freq = freq_to_seconds(pd.to_timedelta(new_freq))
         if new_freq not in self.allowed_agg_freq:
-            raise e.AggregationFrequencyError("Illegal frequency, only frequencies" +
-                                            "divisible that don't disrupt phase" +
+            raise e.AggregationFrequencyError("Illegal frequency, only frequencies " +
+                                            "divisible that don't disrupt phase " +
                                             "changes are allowed.")
-        aggregated_data = {}
-        for k, s in self.subject_split_data.items():
-            self.logger.info("Aggregating on frequency {}".format(new_freq))
-            df = s.resample(new_freq, label='left', closed='left', origin='start',
-                            on='date_time').agg(how).reset_index()
-            df = df.drop('interval', 1) # remove interval so it can be inserted again
-            df = df.rename_axis('interval').reset_index()
-            df.insert(0, "subject", k)
-            aggregated_data[k] = df
-        return Datafile(pd.concat(aggregated_data.values(), axis=0))
-
+        if how is None:
+            how = ColMapper.all_aggregators()
+        how = {p: how.get(p, "mean") for p in self.parameters}
+        how.update({x: "first" for x in self.light_column})
+        self.logger.info("Aggregating on frequency {}".format(new_freq))
+
+        times = self.data.date_time.to_numpy().view("int64")
+        first = times[[a for a, b in self.subject_ranges.values()]]
+        lengths = [b - a for a, b in self.subject_ranges.values()]
+        bins = (times - np.repeat(first, lengths)) // (new_freq * 10**9)
+        aggregated_data = self.data.groupby([self.data.subject, pd.Series(bins, name="interval")],
+                                            observed=True, sort=True).agg(how).reset_index()
+
+        subject_first = pd.Series(first.view("datetime64[ns]"), index=self.subjects)
+        date_time = subject_first[aggregated_data.subject].to_numpy() + \
+            pd.to_timedelta(aggregated_data.interval * new_freq, unit="s").to_numpy()
+        aggregated_data.insert(2, "date_time", date_time)
+        aggregated_data = aggregated_data[self.descriptors[:1] + ["interval", "date_time"] +
+                                          self.light_column + self.parameters]
+        invariants = dict(allowed_agg_freq=[x for x in self.allowed_agg_freq if x % new_freq == 0])
+        if self.regular:
+            invariants.update(freq=new_freq, regular=True,
+                              subject_freq={k: pd.Timedelta(seconds=new_freq) for k in self.subjects})
+        return self.derive(aggregated_data, **invariants)
+
+    @profiled("reorient")
     def reorient_data(self, orientation):
         if orientation == 'subject-wide':
             self.logger.info("Reorienting to subject-wide format")
             # might not meet the Datafile long format specifications
-            df = self.data.melt(id_vars=["subject", "date_time", "interval", "light"],
-                                var_name="parameter")
-            df = df.pivot_table(index=["parameter", "date_time", "interval", "light"],
-                                columns="subject").reset_index()
+            df = self.aligned_subject_wide()
+            if df is None:
+                index = ["parameter", "date_time", "interval"] + \
+                        [x for x in self.light_column if x in self.data.columns]
+                df = self.data.melt(id_vars=index[1:] + ["subject"], value_vars=self.parameters,
+                                    var_name="parameter")
+                df = df.pivot(index=index, columns="subject", values="value")
+                df = df.dropna(how="all").dropna(how="all", axis=1).reset_index()
+                df.columns.name = None
             return df
         else:
             return self.data
 
+    def aligned_subject_wide(self):
+        # when every subject has the same time points, intervals and light, parameter
+        # values of all subjects are reshaped into columns directly, None otherwise
+        lengths = set(b - a for a, b in self.subject_ranges.values())
+        if len(lengths) != 1:
+            return None
+        length = lengths.pop()
+        descriptors = ["date_time", "interval"] + [x for x in self.light_column if x in self.data.columns]
+        columns = {}
+        for x in descriptors:
+            values = self.data[x].to_numpy().reshape(len(self.subjects), length)
+            if not (values == values[:1]).all():
+                return None
+            if x == "date_time" and not (np.diff(values[0]) > np.timedelta64(0)).all():
+                return None
+            columns[x] = np.tile(values[0], len(self.parameters))
+
+        parameters = sorted(self.parameters)
+        values = self.data[parameters].to_numpy(dtype=float).reshape(len(self.subjects), length, len(parameters))
+        values = values.transpose(2, 1, 0).reshape(-1, len(self.subjects))
+        df = pd.DataFrame(values, columns=[str(x) for x in self.subjects])
+        for i, x in enumerate(descriptors):
+            df.insert(i, x, columns[x])
+        df.insert(0, "parameter", np.repeat(parameters, length))
+
+        # same rows and columns as a pivot, which leaves out missing values and keys
+        keep = df[df.columns[len(descriptors) + 1:]].notna().any(axis=1) & df[descriptors].notna().all(axis=1)
+        df = df[keep.to_numpy()].reset_index(drop=True)
+        empty = [x for x in df.columns[len(descriptors) + 1:] if df[x].isna().all()]
+        return df.drop(columns=empty)
+
     def set_datetime_start(self, start_date, start_time):
-        modified_data = {}
-        for k, s in self.subject_split_data.items():
-            new_dt = create_datetime_series(start_date, start_time, s.shape[0], self.freq)
-            with pd.option_context('mode.chained_assignment', None):
-                s.date_time = new_dt
-            modified_data[k] = s
-        return Datafile(pd.concat(modified_data.values(), axis=0))
-
-    def export(self, file):
+        start = datetime.strptime(start_date + " " + start_time, "%Y-%m-%d %H:%M:%S")
+        modified_data = self.data.copy()
+        modified_data.date_time = pd.Timestamp(start) + \
+            pd.to_timedelta(self.subject_row_positions() * self.freq, unit="s")
+        return self.derive(modified_data, freq=self.freq, regular=True,
+                           subject_freq={k: pd.Timedelta(seconds=self.freq) for k in self.subjects})
+
+    def convert_units(self, target, source=None, inplace=False):
+        # converts parameters to the target units, e.g. for export; source units default
+        # to the units of the specification files
+        if source is None:
+            source = ColMapper.all_units()
+        unknown = [x for x in target if x not in self.parameters]
+        if len(unknown) > 0:
+            self.logger.warning("Parameters not present in the datafile are not converted: " + ", ".join(unknown))
+        if inplace:
+            units.convert(self.data, source, target)
+            return self
+        return self.derive(units.convert(self.data.copy(), source, target),
+                           **self.known_attributes(*Datafile.lazy_attributes))
+
+    @profiled("export")
+    def export(self, file, orientation="parameter-wide", compression=None):
+        self.logger.info("Exporting to file: {}".format(file))
+        data = self.reorient_data(orientation)
+        if isinstance(file, str):
+            with exporter.open_output(file, compression) as handle:
+                exporter.write_csv(data, handle, self.parser.time_fmt_out)
+        else:
+            exporter.write_csv(data, file, self.parser.time_fmt_out)
+
+    @profiled("export")
+    def export_columnar(self, file, metadata, file_format, orientation="parameter-wide"):
         self.logger.info("Exporting to file: {}".format(file))
-        self.data.to_csv(file, mode="a", index=False, header=True)
+        columnar.write_table(self.reorient_data(orientation), file, metadata, file_format)
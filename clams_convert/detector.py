@@ -0,0 +1,50 @@
+import re
+import collections
+from .file_parser import pattern_string
+
+
+class Detector:
+    """Recognizes the system of input files from their header. The file_type patterns
+    of all parsers are compiled into one signature expression and only the first
+    sniff_size bytes of every file are searched, the earliest matching signature wins."""
+
+    def __init__(self, parsers, sniff_size=1 << 14, encoding="utf-8"):
+        self.sniff_size = sniff_size
+        self.systems = dict()
+        signatures = []
+        for system, parser in parsers.items():
+            pattern = Detector.signature(parser)
+            if pattern is None:
+                continue
+            group = "s" + str(len(self.systems))
+            self.systems[group] = system
+            signatures.append("(?P<{}>{})".format(group, pattern))
+        self.signatures = re.compile("|".join(signatures).encode(encoding)) if len(signatures) > 0 else None
+
+    @staticmethod
+    def signature(parser):
+        # parsers that cannot be created from a time format alone or that don't define
+        # a file type are never detected
+        try:
+            pattern = parser("%Y-%m-%d %H:%M:%S").patterns.get("file_type")
+        except Exception:
+            return None
+        if pattern is None or len(pattern_string(pattern)) == 0:
+            return None
+        return pattern_string(pattern)
+
+    def detect(self, file):
+        if self.signatures is None:
+            return None
+        with open(file, "rb") as current_file:
+            head = current_file.read(self.sniff_size)
+        match = self.signatures.search(head)
+        return None if match is None else self.systems[match.lastgroup]
+
+    def classify(self, files):
+        # files grouped by their system in the order of the input, unrecognized files
+        # are collected under None
+        routes = collections.OrderedDict()
+        for file in files:
+            routes.setdefault(self.detect(file), []).append(file)
+        return routes
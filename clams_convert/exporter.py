@@ -0,0 +1,61 @@
+import io
+import gzip
+import pandas as pd
+from .file_parser import datetime_layout, format_datetimes
+
+# file name suffixes of the supported csv compressions
+compressions = {
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+
+def import_zstandard():
+    # zstandard is only required for zstd compressed output
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Zstd compression requires the 'zstandard' package.")
+    return zstandard
+
+
+def open_output(path, compression=None, buffer_size=1 << 22):
+    # text stream over a large write buffer, optionally compressed
+    if compression is None:
+        raw = io.FileIO(path, "w")
+    elif compression == "gzip":
+        raw = gzip.GzipFile(path, "wb", compresslevel=6)
+    elif compression == "zstd":
+        raw = import_zstandard().open(path, "wb")
+    else:
+        raise ValueError("Unsupported compression: {}".format(compression))
+    return io.TextIOWrapper(io.BufferedWriter(raw, buffer_size=buffer_size),
+                            encoding="utf-8", newline='')
+
+
+def format_datetime_columns(data, time_fmt):
+    # fixed width formats are rendered with the vectorized formatter, the rest is
+    # left to the date_format of to_csv
+    layout = datetime_layout(time_fmt)
+    if layout is None:
+        return data
+    formatted = {}
+    for column in data.columns:
+        values = data[column]
+        if pd.api.types.is_datetime64_any_dtype(values) and not values.isna().any():
+            formatted[column] = format_datetimes(values.to_numpy(), layout)
+    if len(formatted) == 0:
+        return data
+    data = data.copy(deep=False)
+    for column, values in formatted.items():
+        data[column] = values
+    return data
+
+
+def write_csv(data, file, time_fmt, chunk_size=100000):
+    # rows are rendered chunk by chunk, memory of the export does not grow with the
+    # size of the datafile
+    for start in range(0, max(len(data), 1), chunk_size):
+        chunk = format_datetime_columns(data.iloc[start:start + chunk_size], time_fmt)
+        chunk.to_csv(file, index=False, header=(start == 0), date_format=time_fmt)
+    return file
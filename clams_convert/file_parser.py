@@ -1,8 +1,12 @@
+import io
 import re
+import csv
+import mmap
 import pandas as pd
 import numpy as np
 from abc import abstractmethod
 from . import errors as e
+from .profiler import profiler, profiled
 
 # def regular_freq(delta):
 #     if delta.days > 0:
@@ -28,14 +32,212 @@ def rename_subjects(names):
 def rename_headers(names):
     pass
 
-def convert_values(df, conversion_factor, columns="all"):
-    if isinstance(df, pd.Series):
-        df = df * conversion_factor
-    else:
-        if columns == "all":
-            columns = df.columns
-        df = df.loc[:, columns].apply(lambda x: x * conversion_factor, axis=1)
-    return df
+# character positions of fixed width strftime directives in an iso formatted
+# 'YYYY-MM-DDTHH:MM:SS' string
+ISO_POSITIONS = {"%Y": (0, 4), "%y": (2, 4), "%m": (5, 7), "%d": (8, 10),
+                 "%H": (11, 13), "%M": (14, 16), "%S": (17, 19)}
+
+def datetime_layout(fmt):
+    # maps every character of a formatted timestamp either to a position in the iso
+    # string or to a literal character, None if fmt is not fixed width numeric
+    layout = []
+    for token in re.split("(%.)", fmt):
+        if token in ISO_POSITIONS:
+            layout.extend(range(*ISO_POSITIONS[token]))
+        elif token == "%%":
+            layout.append("%")
+        elif token.startswith("%"):
+            return None
+        else:
+            layout.extend(token)
+    return layout
+
+def format_datetimes(values, layout):
+    # vectorized strftime for fixed width layouts, rearranges characters of the iso
+    # representation instead of formatting every timestamp in python
+    iso = np.datetime_as_string(np.asarray(values, dtype="datetime64[s]"))
+    iso = iso.astype("U19").view("U1").reshape(-1, 19)
+    chars = np.empty((iso.shape[0], len(layout)), dtype="U1")
+    for i, x in enumerate(layout):
+        chars[:, i] = iso[:, x] if isinstance(x, int) else x
+    return chars.view("U" + str(len(layout))).ravel()
+
+def parse_timestamps(text, fmt, window=256):
+    # instrument clocks tick with a fixed period, so timestamps are generated from a
+    # parsed anchor and the detected period and only verified against the source text
+    # in growing windows; from the first row deviating from the period on the rest is
+    # parsed at once by pandas, irregular series cost a single extra window check
+    text = np.asarray(text, dtype=str)
+    layout = datetime_layout(fmt)
+    if layout is None or len(text) < 2 or len(text[0]) != len(layout):
+        return pd.to_datetime(text, format=fmt).values
+
+    result = np.empty(len(text), dtype="datetime64[ns]")
+    anchor = pd.to_datetime(text[:2], format=fmt).values
+    result[:2] = anchor
+    end = 2
+    if anchor[1] > anchor[0]:
+        period = anchor[1] - anchor[0]
+        size = window
+        while end < len(text):
+            stop = min(len(text), end + size)
+            expected = anchor[0] + period * np.arange(end, stop)
+            matched = format_datetimes(expected, layout) == text[end:stop]
+            if not matched.all():
+                regular = np.argmin(matched)
+                result[end:end + regular] = expected[:regular]
+                end = end + regular
+                break
+            result[end:stop] = expected
+            end = stop
+            size = size * 2
+    if end < len(text):
+        result[end:] = pd.to_datetime(text[end:], format=fmt).values
+    return result
+
+# date and time layouts of the exports of supported systems, tried when the input
+# time format is not given
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d/%m/%y", "%m/%d/%y", "%d.%m.%Y", "%d.%m.%y"]
+TIME_FORMATS = ["%H:%M:%S", "%H:%M", "%I:%M:%S %p", "%I:%M %p"]
+TIME_FMT_CANDIDATES = [d + " " + t for d in DATE_FORMATS for t in TIME_FORMATS]
+
+def infer_time_format(text):
+    # the candidate formats that parse every timestamp, a format is only returned
+    # when all of them agree, e.g. day and month order can't be told apart as long as
+    # no day is after the 12th and the file is rejected instead of guessing
+    text = np.asarray(text, dtype=str)
+    if len(text) == 0:
+        raise ValueError("No timestamps to infer the time format from.")
+    parsed = dict()
+    errors = []
+    for fmt in TIME_FMT_CANDIDATES:
+        try:
+            # the first timestamp screens out most candidates cheaply
+            pd.to_datetime(text[:1], format=fmt)
+        except ValueError:
+            continue
+        try:
+            parsed[fmt] = parse_timestamps(text, fmt)
+        except ValueError as err:
+            errors.append(err)
+    if len(parsed) == 0 and len(errors) > 0:
+        raise errors[0]
+    if len(parsed) == 0:
+        raise ValueError("Time format of '{}' was not recognized, please set --time_fmt_in.".format(text[0]))
+    formats = list(parsed)
+    if any(not np.array_equal(parsed[formats[0]], parsed[x]) for x in formats[1:]):
+        raise ValueError("Time format of '{}' is ambiguous ({}), please set --time_fmt_in."
+                         .format(text[0], ", ".join(formats)))
+    return formats[0]
+
+def pattern_string(pattern):
+    return getattr(pattern, "pattern", pattern)
+
+def combine_patterns(patterns):
+    # single alternation used as a cheap pre-filter, lines that pass are then
+    # matched against the individual patterns
+    unique = list(dict.fromkeys(pattern_string(p) for p in patterns))
+    if all(isinstance(p, bytes) for p in unique):
+        return re.compile(b"|".join(b"(?:" + p + b")" for p in unique))
+    return re.compile("|".join("(?:" + p + ")" for p in unique))
+
+# \n, \r\n and a bare \r all end a line, as in str.splitlines
+LINE_END = re.compile(b"\r\n|\r|\n")
+
+def iter_lines(file, block_size=1 << 16):
+    # lines of a binary file read in blocks from its current position, yields the line
+    # without its line end together with the byte offsets of its start and of the
+    # following line
+    position = file.tell()
+    pending = b""
+    while True:
+        block = file.read(block_size)
+        buffer = pending + block
+        start = 0
+        for match in LINE_END.finditer(buffer):
+            # \r at the end of a block may be the first half of \r\n
+            if match.end() == len(buffer) and len(block) > 0 and buffer.endswith(b"\r"):
+                break
+            yield buffer[start:match.start()], position + start, position + match.end()
+            start = match.end()
+        position += start
+        pending = buffer[start:]
+        if len(block) == 0:
+            if len(pending) > 0:
+                yield pending, position, position + len(pending)
+            return
+
+def rsearch_line(file, pattern, start=0, block_size=1 << 16):
+    # returns byte offset of the start of the last line matching the bytes pattern,
+    # the file is read backwards in blocks and lines are never split between blocks
+    line_pattern = re.compile(b"(?:^|(?<=\r))[^\r\n]*?(?:" + pattern + b")", re.MULTILINE)
+    file.seek(0, io.SEEK_END)
+    end = file.tell()
+    carry = b""
+    while end > start:
+        block_start = max(start, end - block_size)
+        file.seek(block_start)
+        block = file.read(end - block_start) + carry
+        cut = 0
+        if block_start > start:
+            first = LINE_END.search(block)
+            cut = 0 if first is None else first.end()
+            if cut == 0:
+                carry = block
+                end = block_start
+                continue
+        match = None
+        for match in line_pattern.finditer(block, cut):
+            pass
+        if match is not None:
+            return block_start + match.start()
+        carry = block[:cut]
+        end = block_start
+    return None
+
+class BlockReader(io.RawIOBase):
+    """Read-only binary view over a byte range of an open file. Lets the csv reader
+    consume the data block directly from disk without loading it into memory."""
+
+    def __init__(self, file, start, end=None):
+        super().__init__()
+        self.file = file
+        self.end = end
+        self.file.seek(start)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = len(buffer)
+        if self.end is not None:
+            size = min(size, max(self.end - self.file.tell(), 0))
+        return self.file.readinto(memoryview(buffer)[:size])
+
+
+class BufferReader(io.RawIOBase):
+    """Read-only binary stream over a buffer such as a memoryview slice of a memory
+    mapped file. Bytes are copied only into the reads requested by the csv reader."""
+
+    def __init__(self, buffer):
+        super().__init__()
+        self.buffer = memoryview(buffer)
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), len(self.buffer) - self.position)
+        buffer[:size] = self.buffer[self.position:self.position + size]
+        self.position += size
+        return size
+
+    def close(self):
+        # exported buffer has to be released before the underlying mmap is closed
+        self.buffer.release()
+        super().close()
+
 
 class FileParser:
 
@@ -54,13 +256,20 @@ class FileParser:
             "data_start": 0,
             "data_end": 0
         }
-        # self.format_description = {
-        #     "multifile": None,
-        #     "multiparameter": None
-        # }
+        self.format_description = {
+            "multifile": None,
+            "multiparameter": None
+        }
         self.patterns_other = {}
         self.line_numbers = {}
+        self.positions = {}
         self.split_char = ","
+        self.encoding = "utf-8"
+        self.fallback_encoding = "latin-1"
+        self.memory_map = False
+        self.na_values = []
+        self.chunk_size = 50000
+        self.repair_header = repair_header
         self.conversion_factor = 1
         self.interval = None
 
@@ -72,22 +281,6 @@ class FileParser:
     def prettify(self, data, subjects, *args):
         pass
 
-    @staticmethod
-    def parse_text(file):
-        text = file.read().splitlines()
-        text = [line for line in text if len(line) > 0]
-        return text
-
-    @staticmethod
-    def search_pattern(pattern, text):
-        # searches for the last occurring pattern
-        # might be changed to discard all header records from data
-        line_no = 0
-        for i, line in enumerate(text):
-            if re.search(pattern, line):
-                line_no = i
-        return line_no
-
     def update_info(self, **kwargs):
         for k, v in kwargs.items():
             try:
@@ -96,11 +289,84 @@ class FileParser:
                 print("Trying to modify non-existent property in FileParser.")
 
 
-    def init_line_numbers(self, text):
+    def locate_sections(self, file):
+        # single forward pass over the binary file, line numbers count only non-empty
+        # lines; all header anchors are matched together and the scan stops at the
+        # data block once they are resolved, returns the header lines preceding it
         self.is_set_patterns()
-        for k, v in self.patterns.items():
-            self.line_numbers[k] = self.search_pattern(v, text)
+        anchors = {k: re.compile(pattern_string(v).encode(self.encoding)) for k, v in self.patterns.items()
+                   if k != "data_end" and len(pattern_string(v)) > 0}
+        if "data_start" not in anchors:
+            raise e.FileFormatError("Set re for data_start is required for a custom parser.")
+        combined = combine_patterns(anchors.values())
+        self.line_numbers = {k: None for k in anchors}
+        self.positions = {}
+
+        header = []
+        data_line = None
+        data_started = False
+        line_no = 0
+        position = file.tell()
+        for raw, line_start, position in iter_lines(file):
+            if len(raw) == 0:
+                continue
+            if not data_started:
+                # header blocks can be repeated, later matches preceding the data
+                # overwrite earlier ones
+                if combined.search(raw):
+                    for k, v in anchors.items():
+                        if v.search(raw):
+                            self.line_numbers[k] = line_no
+                    if self.line_numbers["data_start"] == line_no:
+                        data_line = line_no + self.offsets['data_start']
+                    elif line_no == data_line:
+                        data_line = None
+                # offset 0 marks the data_start anchor line itself
+                if line_no == data_line:
+                    self.positions['data_start'] = line_start
+                    data_started = True
+                else:
+                    header.append(self.decode_line(raw))
+            elif any(v is None for v in self.line_numbers.values()):
+                if combined.search(raw):
+                    for k, v in anchors.items():
+                        if self.line_numbers[k] is None and v.search(raw):
+                            self.line_numbers[k] = line_no
+            else:
+                break
+            line_no += 1
+
         self.validate_line_numbers()
+        self.positions.setdefault('data_start', position)
+        self.locate_data_end(file)
+        return header
+
+    def decode_line(self, raw):
+        # only header lines are decoded, instrument software often writes units such
+        # as the degree sign in a legacy single byte encoding
+        try:
+            return raw.decode(self.encoding)
+        except UnicodeDecodeError:
+            return raw.decode(self.fallback_encoding)
+
+    def locate_data_end(self, file):
+        # data_end uses the last occurring match, so it is searched from the end of
+        # the file backwards and the data block itself is never scanned line by line
+        end_anchor = self.patterns["data_end"]
+        if len(pattern_string(end_anchor)) == 0:
+            return self
+        position = rsearch_line(file, pattern_string(end_anchor).encode(self.encoding),
+                                start=self.positions['data_start'])
+        if position is not None:
+            file.seek(position)
+            skip = self.offsets['data_end']
+            for raw, line_start, line_end in iter_lines(file):
+                if skip <= 0:
+                    break
+                if len(raw) > 0:
+                    skip -= 1
+                position = line_end
+            self.positions['data_end'] = position
         return self
 
     def is_set_patterns(self):
@@ -112,7 +378,7 @@ class FileParser:
         for k, v in self.line_numbers.items():
             if v is None:
                 raise e.FileFormatError("Format not recognized, required pattern "
-                                        + "'{}' for {} is missing. ".format(self.patterns[k].pattern, k))
+                                        + "'{}' for {} is missing. ".format(pattern_string(self.patterns[k]), k))
         return self
 
     def make_header_unique(self, header):
@@ -126,36 +392,81 @@ class FileParser:
         else:
             return header
     
-    def read_data(self, text):
-        header = text[self.line_numbers['data_start'] + self.offsets['header_start']]
-        header = header.split(self.split_char)
-
-        df_start = self.line_numbers['data_start'] + self.offsets['data_start']
-        df_end = max(len(text), self.line_numbers['data_end'] + self.offsets['data_end'])
-
-        records = text[df_start:df_end]
-        split_records = [x.split(self.split_char) for x in records]
-        data = pd.DataFrame(np.array(split_records))
-        data = data.iloc[:, 0:len(header)]
-        data.columns = self.make_header_unique(header)
+    def read_data(self, file, header):
+        columns = header[self.line_numbers['data_start'] + self.offsets['header_start']]
+        columns = self.make_header_unique(columns.split(self.split_char))
+
+        usecols, dtype = self.data_columns(columns)
+
+        if isinstance(file, mmap.mmap):
+            block = BufferReader(memoryview(file)[self.positions['data_start']:self.positions.get('data_end')])
+        else:
+            block = BlockReader(file, self.positions['data_start'], self.positions.get('data_end'))
+        try:
+            with block:
+                chunks = pd.read_csv(block, sep=self.split_char, header=None, engine="c",
+                                     usecols=usecols, dtype=dtype, na_values=self.na_values,
+                                     keep_default_na=False, quoting=csv.QUOTE_NONE,
+                                     encoding=self.encoding, chunksize=self.chunk_size)
+                data = pd.concat(chunks, axis=0, ignore_index=True)
+        except pd.errors.EmptyDataError:
+            raise e.FileFormatError("Data section of the file doesn't contain any records.")
+        except ValueError as err:
+            raise e.FileFormatError("Data section doesn't match the column specification. " + str(err))
+        data.columns = [columns[i] for i in usecols]
         return data
 
+    def data_columns(self, columns):
+        # positions and dtypes of the columns handed to the csv reader, when the mapper
+        # specifies source columns only those are parsed, straight into their spec type
+        # the rest of the parsers get every column as string
+        if self.mapper is not None:
+            usecols = [i for i, x in enumerate(columns) if x in self.mapper.source_columns]
+            if len(usecols) > 0:
+                dtype = {i: self.mapper.typer.get(columns[i], str) for i in usecols}
+                return usecols, dtype
+        return list(range(len(columns))), str
+
     def format_ts(self, ts):
-        ts = ts.str.strip()
-        ts = pd.to_datetime(ts, format=self.time_fmt_in)
-        ts = ts.dt.strftime(self.time_fmt_out)
-        ts.name = "date_time"
+        # timestamps stay datetime64 through the pipeline, time_fmt_out is applied only
+        # when exporting
+        text = ts.str.strip()
+        fmt = self.time_fmt_in
+        if fmt is None:
+            try:
+                fmt = infer_time_format(text)
+            except ValueError as err:
+                raise e.FileFormatError(str(err))
+        try:
+            ts = pd.Series(parse_timestamps(text, fmt),
+                           index=ts.index, name="date_time")
+        except ValueError as err:
+            raise e.FileFormatError("Timestamps don't match the input time format. " + str(err))
         return ts
 
+    def open_source(self, current_file):
+        # with memory_map the anchors are searched directly in the mapped pages and the
+        # data block is handed to the csv reader as a slice of the same buffer
+        if not self.memory_map:
+            return current_file
+        try:
+            return mmap.mmap(current_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise e.FileFormatError("File is empty.")
+
+    @profiled("parse")
     def parse(self, file):
-        # TODO there is an error in clams-tse due to utf failing to read degree sign
-        with open(file, "r") as current_file:
-            text = self.parse_text(current_file)
+        with open(file, "rb") as current_file:
             try:
-                self.init_line_numbers(text)
-                subjects = self.parse_subject_names(text)
-                data = self.read_data(text)
-                data = self.prettify(data, subjects)
+                with self.open_source(current_file) as source:
+                    header = self.locate_sections(source)
+                    subjects = self.parse_subject_names(header)
+                    data = self.read_data(source, header)
+                with profiler.stage("prettify") as record:
+                    data = self.prettify(data, subjects)
+                    record["rows"] = len(data)
+                if self.mapper is not None:
+                    data = self.mapper.compact(data)
             except (e.FileFormatError, e.SubjectIdError) as err:
                 print(file, " - ", err, "Skipping")
                 raise
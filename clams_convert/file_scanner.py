@@ -3,8 +3,9 @@ import os
 
 class FileScanner:
 
-    def __init__(self, path, extensions=None, pattern=None, exclude_pattern=None):
+    def __init__(self, path, extensions=None, pattern=None, exclude_pattern=None, recursive=False):
         self.path = path
+        self.recursive = recursive
         self.pattern = ("" if pattern is None else pattern)
         self.exclude_pattern = exclude_pattern
         self.accepted_extensions = extensions
@@ -14,9 +15,15 @@ class FileScanner:
         if os.path.isfile(self.path):
             files = [self.path]
         elif os.path.isdir(self.path):
+            # with recursive the subdirectories are searched as well
+            prefix = self.path + ("/**/*" if self.recursive else "/*")
             for ext in self.accepted_extensions:
-                for file in glob.glob(self.path + "/*" + self.pattern + "*." + ext):
+                for file in glob.glob(prefix + self.pattern + "*." + ext, recursive=self.recursive):
                     files.append(file)
+                if ext.upper() != ext:
+                    for file in glob.glob(prefix + self.pattern + "*." + ext.upper(), recursive=self.recursive):
+                        files.append(file)
+            files = sorted(files)
             if self.exclude_pattern is not None:
                 files = [x for x in files if self.exclude_pattern not in x]
         else:
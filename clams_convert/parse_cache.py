@@ -0,0 +1,109 @@
+import os
+import sys
+import inspect
+import hashlib
+import logging
+from . import columnar
+
+
+def file_digest(file, block_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file, "rb") as current_file:
+        for block in iter(lambda: current_file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_modules(parser):
+    # modules of the package that define the parser, its base classes and its mapper
+    classes = list(type(parser).__mro__) + [type(parser.mapper)]
+    names = [x.__module__ for x in classes if x.__module__.split(".")[0] == __name__.split(".")[0]]
+    return [sys.modules[x] for x in sorted(set(names))]
+
+def parser_signature(parser):
+    # everything outside the input file that changes the prettified frame, including
+    # the code of the parser so that entries of older versions are not reused
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(type(parser).__name__.encode())
+    for module in source_modules(parser):
+        digest.update(inspect.getsource(module).encode())
+    digest.update(str(parser.time_fmt_in).encode())
+    if parser.mapper is not None:
+        digest.update(parser.mapper.specs.to_csv(index=False).encode())
+        digest.update(str(sorted(parser.mapper.dtypes.items())).encode())
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """On-disk cache of prettified frames stored as feather files. Entries are keyed by
+    the input file (path, size, mtime and content hash) and the parser signature, the
+    least recently used entries are evicted when the cache grows over max_size bytes."""
+
+    extension = ".feather"
+
+    def __init__(self, path, signature, max_size=1 << 30):
+        self.path = path
+        self.signature = signature
+        self.max_size = max_size
+        self.logger = logging.getLogger('clams-convert')
+        # fails at startup rather than on the first file when pyarrow is missing
+        columnar.import_pyarrow()
+        os.makedirs(self.path, exist_ok=True)
+
+    def key(self, file):
+        stat = os.stat(file)
+        digest = hashlib.blake2b(digest_size=20)
+        for x in (os.path.abspath(file), stat.st_size, stat.st_mtime_ns, file_digest(file), self.signature):
+            digest.update(str(x).encode())
+        return digest.hexdigest()
+
+    def entry(self, key):
+        return os.path.join(self.path, key + ParseCache.extension)
+
+    def get(self, key):
+        entry = self.entry(key)
+        try:
+            data, metadata = columnar.read_table(entry, "feather")
+            # modification time of an entry marks its last use
+            os.utime(entry)
+        except (OSError, ValueError):
+            return None
+        return data
+
+    def put(self, key, data):
+        entry = self.entry(key)
+        tmp = entry + "." + str(os.getpid()) + ".tmp"
+        columnar.write_table(data, tmp, dict(), "feather")
+        os.replace(tmp, entry)
+        self.evict()
+        return self
+
+    def entries(self):
+        entries = []
+        for name in os.listdir(self.path):
+            if name.endswith(ParseCache.extension):
+                try:
+                    stat = os.stat(os.path.join(self.path, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        return sorted(entries)
+
+    def evict(self):
+        entries = self.entries()
+        size = sum(x[1] for x in entries)
+        for mtime, entry_size, name in entries:
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.path, name))
+                self.logger.info("Evicted from parse cache: {}".format(name))
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+        return self
+
+    def clear(self):
+        for mtime, entry_size, name in self.entries():
+            os.remove(os.path.join(self.path, name))
+        return self
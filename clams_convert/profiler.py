@@ -0,0 +1,115 @@
+import sys
+import json
+import time
+import functools
+import contextlib
+import tracemalloc
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_rss():
+    # high-water mark of the resident set size in bytes, None where not available
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def count_rows(source):
+    data = getattr(source, "data", source)
+    return len(data) if isinstance(data, pd.DataFrame) else None
+
+
+class Profiler:
+    """Collects wall time, processed rows and the peak resident set of the process at
+    the end of the pipeline stages. While tracemalloc is tracing, the peak of memory
+    allocated within every stage is recorded as well. Nested stages are recorded
+    separately, times and allocations are inclusive."""
+
+    def __init__(self):
+        self.records = []
+        # allocation at the start and highest allocation seen of the open stages, the
+        # single tracemalloc peak is reset for every stage
+        self.traced = []
+
+    def start_trace(self):
+        current, peak = tracemalloc.get_traced_memory()
+        if len(self.traced) > 0:
+            self.traced[-1][1] = max(self.traced[-1][1], peak)
+        tracemalloc.reset_peak()
+        self.traced.append([current, current])
+
+    def stop_trace(self):
+        current, peak = tracemalloc.get_traced_memory()
+        start, seen = self.traced.pop()
+        peak = max(peak, seen)
+        if len(self.traced) > 0:
+            self.traced[-1][1] = max(self.traced[-1][1], peak)
+        tracemalloc.reset_peak()
+        return peak - start
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        record = dict(stage=name, rows=rows)
+        self.records.append(record)
+        traced = tracemalloc.is_tracing()
+        if traced:
+            self.start_trace()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            record["peak_rss"] = peak_rss()
+            if traced:
+                record["peak_alloc"] = self.stop_trace()
+
+    def summary(self):
+        columns = ["stage", "calls", "seconds", "rows", "peak_rss_mb"]
+        if any("peak_alloc" in x for x in self.records):
+            columns.append("peak_alloc_mb")
+        if len(self.records) == 0:
+            return pd.DataFrame(columns=columns)
+        records = pd.DataFrame(self.records, columns=["stage", "rows", "seconds", "peak_rss", "peak_alloc"])
+        summary = records.groupby("stage", sort=False).agg(
+            calls=("seconds", "size"),
+            seconds=("seconds", "sum"),
+            rows=("rows", "sum"),
+            peak_rss_mb=("peak_rss", "max"),
+            peak_alloc_mb=("peak_alloc", "max")).reset_index()
+        summary["seconds"] = summary["seconds"].round(4)
+        summary["rows"] = summary["rows"].astype("int64")
+        for column in ["peak_rss_mb", "peak_alloc_mb"]:
+            summary[column] = (summary[column].astype("float64") / 2**20).round(1)
+        return summary[columns]
+
+    def dump(self, file):
+        with open(file, "w") as current_file:
+            json.dump(self.records, current_file, indent=1)
+
+    def clear(self):
+        self.records = []
+        return self
+
+
+profiler = Profiler()
+
+
+def profiled(name):
+    # records every call of the decorated function as a stage, rows are taken from the
+    # returned frame or datafile, or from the datafile the method was called on
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with profiler.stage(name) as record:
+                result = function(*args, **kwargs)
+                record["rows"] = count_rows(result)
+                if record["rows"] is None and len(args) > 0:
+                    record["rows"] = count_rows(args[0])
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,64 @@
+import numpy as np
+
+# multiplicative factors between units, written in the bracketed form of the unit
+# column of the specification files; every conversion can be used in both directions
+# and conversions are chained, e.g. [turns] -> [m] -> [km]
+factors = {
+    ("[turns]", "[m]"): 0.6912,
+    ("[m]", "[km]"): 1e-3,
+    ("[m]", "[cm]"): 1e2,
+    ("[ml]", "[l]"): 1e-3,
+    ("[ml]", "[ul]"): 1e3,
+    ("[g]", "[kg]"): 1e-3,
+    ("[g]", "[mg]"): 1e3,
+    ("[ml/h/kg]", "[l/h/kg]"): 1e-3,
+    ("[ml/h/kg]", "[ml/min/kg]"): 1 / 60,
+    ("[kcal/h/kg]", "[kJ/h/kg]"): 4.184,
+    ("[kcal/h/kg]", "[W/kg]"): 4184 / 3600,
+}
+
+
+def normalize(unit):
+    # units are accepted with or without the brackets used in the spec files
+    unit = str(unit).strip()
+    return unit if unit.startswith("[") else "[" + unit + "]"
+
+def factor(source, target):
+    # breadth first search over the conversion table, the first chain found is used
+    source, target = normalize(source), normalize(target)
+    found = {source: 1.0}
+    queue = [source]
+    while len(queue) > 0:
+        unit = queue.pop(0)
+        if unit == target:
+            return found[unit]
+        for (a, b), f in factors.items():
+            for x, y, g in ((a, b, f), (b, a, 1 / f)):
+                if x == unit and y not in found:
+                    found[y] = found[unit] * g
+                    queue.append(y)
+    raise ValueError("Unit {} cannot be converted to {}".format(source, target))
+
+def parse_units(specs):
+    # 'column=unit' pairs from the command line into a dict of columns and units
+    units = dict()
+    for spec in specs or []:
+        column, sep, unit = spec.partition("=")
+        if sep == "" or len(column.strip()) == 0 or len(unit.strip()) == 0:
+            raise ValueError("Unit conversion has to be specified as 'column=unit', got: {}".format(spec))
+        units[column.strip()] = normalize(unit)
+    return units
+
+def convert(data, source, target):
+    # converts columns of data in place from source to target units, both map columns
+    # to units; float columns are multiplied in place, integer columns become floats
+    # and single precision columns stay single precision
+    columns = [x for x in data.columns
+               if source.get(x) is not None and target.get(x) is not None
+               and normalize(source[x]) != normalize(target[x])]
+    for column in columns:
+        dtype = np.result_type(data[column].dtype, np.float32)
+        if data[column].dtype != dtype:
+            data[column] = data[column].astype(dtype)
+        data[column] *= dtype.type(factor(source[column], target[column]))
+    return data
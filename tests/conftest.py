@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def experiment():
+    # factory of long format experiments as produced by the parsers; times are either
+    # the number of regular observations or timestamps, shared by all subjects or given
+    # per subject, light and parameters are per row or repeated for every subject
+    def make(subjects=("a", "b"), times=4, start="2020-01-01 00:00:00", freq="min", light=(1, 1, 0, 0),
+             **parameters):
+        if isinstance(times, int):
+            times = pd.date_range(start, periods=times, freq=freq)
+        if not isinstance(times, dict):
+            times = {x: times for x in subjects}
+        times = {k: pd.to_datetime(list(v)) for k, v in times.items()}
+        lengths = [len(x) for x in times.values()]
+        data = pd.DataFrame({
+            "subject": np.repeat(list(times.keys()), lengths),
+            "date_time": np.concatenate([x.values for x in times.values()]),
+            "interval": np.concatenate([np.arange(x) for x in lengths]),
+        })
+        columns = dict(parameters) if light is None else dict(light=light, **parameters)
+        for name, values in columns.items():
+            values = list(values)
+            data[name] = values if len(values) == len(data) else values * len(times)
+        return data
+    return make
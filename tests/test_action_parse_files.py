@@ -0,0 +1,78 @@
+import shutil
+import pytest
+import collections
+import pandas as pd
+from clams_convert import errors as e
+from clams_convert.action import Convert, parse_file
+from clams_convert.custom_parser import ClamsOxymaxParser
+from clams_convert.profiler import profiler
+
+SOURCE = "test_data/test_input/classic_2/"
+FORMAT = "%d/%m/%Y %H:%M:%S"
+
+
+class FailingParser(ClamsOxymaxParser):
+    # module level so that it can be sent to worker processes
+    def parse(self, file):
+        if file.endswith("failing.CSV"):
+            raise ValueError("worker failure")
+        if file.endswith("broken.CSV"):
+            raise RuntimeError("parser bug")
+        return super().parse(file)
+
+
+def make_input(path):
+    path.mkdir()
+    for name in ["2019-09-09.0101.CSV", "2019-09-09.0102.CSV", "2019-09-09.0103.CSV"]:
+        shutil.copy(SOURCE + name, path / name)
+    with open(SOURCE + "2019-09-09.0104.CSV", "rb") as f:
+        header = f.read().split(b"\n")[:25]
+    (path / "header_only.CSV").write_bytes(b"\n".join(header))
+    shutil.copy(SOURCE + "2019-09-09.0105.CSV", path / "failing.CSV")
+    return path
+
+def make_action(parser, path, jobs):
+    output = path.parent / ("out" + str(jobs))
+    output.mkdir()
+    cmd = dict(input=str(path), output=str(output), system="clams-oxymax", time_fmt_in=FORMAT,
+               frequency=0, jobs=jobs)
+    return Convert(parser, cmd)
+
+def test_parse_files_jobs(tmp_path):
+    path = make_input(tmp_path / "input")
+    sequential = make_action(FailingParser, path, 1)
+    parallel = make_action(FailingParser, path, 2)
+    expected = sequential.parse_files()
+    parsed = parallel.parse_files()
+    assert len(parsed) == 3
+    for data, reference in zip(parsed, expected):
+        pd.testing.assert_frame_equal(data, reference)
+    assert sorted(parallel.errors) == sorted(sequential.errors)
+    assert sorted(x.split("/")[-1] for x in parallel.errors) == ["failing.CSV", "header_only.CSV"]
+    assert all(isinstance(x, e.FileFormatError) for x in parallel.errors.values())
+
+def test_parse_file_unexpected_error(tmp_path):
+    path = make_input(tmp_path / "input")
+    file, data, err, records = parse_file(FailingParser(FORMAT), str(path / "failing.CSV"))
+    assert data is None
+    assert isinstance(err, e.FileFormatError)
+    assert "ValueError: worker failure" in str(err)
+
+def test_parse_files_programming_error(tmp_path):
+    path = make_input(tmp_path / "input")
+    shutil.copy(SOURCE + "2019-09-09.0105.CSV", path / "broken.CSV")
+    for jobs in [1, 2]:
+        with pytest.raises(RuntimeError, match="parser bug"):
+            make_action(FailingParser, path, jobs).parse_files()
+
+def test_parse_files_jobs_profile(tmp_path):
+    path = make_input(tmp_path / "input")
+    stages = []
+    for jobs in [1, 2]:
+        action = make_action(FailingParser, path, jobs)
+        profiler.clear()
+        action.parse_files()
+        stages.append(collections.Counter((x["stage"], x["rows"]) for x in profiler.records))
+    profiler.clear()
+    assert stages[0]["prettify", 290] == 3
+    assert stages[1] == stages[0]
@@ -0,0 +1,51 @@
+import os
+import sys
+import shutil
+import subprocess
+from clams_convert.datafile import Datafile
+from clams_convert.file_scanner import FileScanner
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "clams_convert.py")
+
+
+def run_convert(*args):
+    return subprocess.run([sys.executable, SCRIPT, "convert"] + list(args), capture_output=True, text=True)
+
+def make_input(path):
+    # experiments of two systems, one of them in a subdirectory
+    (path / "wheels").mkdir(parents=True)
+    shutil.copy("test_data/test_input/classic_2/2019-09-09.0101.CSV", path)
+    shutil.copy("test_data/test_input/classic_2/2019-09-09.VO2.CSV", path)
+    shutil.copy("test_data/test_input/zierathold_1/week1.asc", path / "wheels")
+    return path
+
+def test_scan_files_recursive(tmp_path):
+    path = make_input(tmp_path / "input")
+    assert len(FileScanner(str(path), ["csv", "asc"]).scan_files()) == 2
+    files = FileScanner(str(path), ["csv", "asc"], recursive=True).scan_files()
+    assert sorted(os.path.basename(x) for x in files) == ["2019-09-09.0101.CSV", "2019-09-09.VO2.CSV", "week1.asc"]
+
+def test_convert_auto_systems(tmp_path):
+    path = make_input(tmp_path / "input")
+    output = tmp_path / "output"
+    output.mkdir()
+    result = run_convert("-i", str(path), "-o", str(output), "--system", "auto")
+    assert result.returncode == 0, result.stderr
+    assert "Detected clams-oxymax" in result.stdout
+    assert "Detected fwr-zierathold" in result.stdout
+    # day and month order of the wheel timestamps can't be told apart, so that
+    # experiment is skipped instead of guessed
+    assert "is ambiguous" in result.stdout
+    exported = [Datafile(str(x)) for x in sorted(output.glob("*_convert.csv"))]
+    assert len(exported) == 1
+    assert "vo2" in exported[0].parameters
+    assert str(exported[0].data.date_time.min()) == "2019-09-09 11:22:43"
+
+def test_convert_auto_systems_time_format(tmp_path):
+    path = make_input(tmp_path / "input")
+    output = tmp_path / "output"
+    output.mkdir()
+    result = run_convert("-i", str(path), "-o", str(output), "--system", "auto", "--time_fmt_in", "%d/%m/%Y %H:%M:%S")
+    assert result.returncode != 0
+    assert "single --time_fmt_in" in result.stderr
+    assert len(list(output.glob("*_convert.csv"))) == 0
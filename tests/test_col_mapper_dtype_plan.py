@@ -0,0 +1,39 @@
+import pytest
+import numpy as np
+import pandas as pd
+from clams_convert.col_mapper import ColMapper, apply_dtypes
+
+def make_specs():
+    return pd.DataFrame({
+        "app": ["subject", "light", "vo2", "xt", "counts", None],
+        "unit": [None, None, "[ml/h/kg]", "[counts]", "[counts]", None],
+        "type": ["str", "float", "float", "int", "float", None],
+    })
+
+def test_dtype_plan():
+    plan = ColMapper.dtype_plan(make_specs())
+    assert plan["subject"] == "category"
+    assert plan["date_time"] == "datetime64[ns]"
+    assert plan["light"] == "int8"
+    assert plan["vo2"] == "float64"
+    assert plan["xt"] == "uint16"
+    assert plan["counts"] == "uint16"
+    assert ColMapper.dtype_plan(make_specs(), float32=True)["vo2"] == "float32"
+
+def test_apply_dtypes():
+    data = pd.DataFrame({
+        "subject": ["a", "a", "b"],
+        "light": [1, 0, 1],
+        "vo2": [1.5, 2.5, 3.5],
+        "xt": [1, 2, 70000],
+        "counts": [1.0, np.nan, 3.0],
+        "z": [1.0, 2.0, 3.0],
+    })
+    dtypes = dict(subject="category", light="int8", vo2="float32", xt="uint16", counts="uint16", z="uint16")
+    apply_dtypes(data, dtypes)
+    assert data.subject.dtype == "category"
+    assert data.light.dtype == np.int8
+    assert data.vo2.dtype == np.float32
+    assert data.xt.dtype == np.uint32
+    assert data.counts.dtype == np.float64
+    assert data.z.dtype == np.uint16
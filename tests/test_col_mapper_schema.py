@@ -0,0 +1,49 @@
+import pickle
+import pytest
+import pandas as pd
+from clams_convert.col_mapper import ColMapper, Schema
+
+def make_specs():
+    return pd.DataFrame({
+        "display": ["Subject", "X Total", "Y Total", "XY Total"],
+        "app": ["subject", "xt", "yt", "xyt"],
+        "unit": [None, "[counts]", "[counts]", "[counts]"],
+        "type": [None, "int", "int", None],
+        "aggregate": [None, "sum", "sum", "sum"],
+        "colnames": [None, "XTOT", "YTOT", None],
+        "expression": [None, None, None, "xt + yt"],
+    })
+
+def test_schema_derive():
+    schema = Schema(make_specs())
+    data = pd.DataFrame({"subject": ["a", "b"], "xt": [1, 2], "yt": [10, 20]})
+    assert list(schema.derive(data).xyt) == [11, 22]
+    assert schema.columns == ("subject", "xt", "yt", "xyt")
+
+def test_schema_immutable():
+    schema = Schema(make_specs())
+    with pytest.raises(AttributeError):
+        schema.mapper = dict()
+    with pytest.raises(AttributeError):
+        del schema.derived
+    with pytest.raises(TypeError):
+        schema.mapper["XTOT"] = "other"
+    with pytest.raises(TypeError):
+        schema.dtypes["xt"] = "float64"
+    schema.specs.loc[0, "app"] = "other"
+    assert schema.specs.loc[0, "app"] == "subject"
+
+def test_schema_pickle():
+    schema = Schema(make_specs(), float32=True)
+    copy = pickle.loads(pickle.dumps(schema))
+    assert copy.mapper == schema.mapper
+    assert copy.dtypes == schema.dtypes
+
+def test_schema_compiled_once():
+    assert ColMapper("clams-oxymax").schema is ColMapper("clams-oxymax").schema
+    assert ColMapper("clams-oxymax", float32=True).dtypes["vo2"] == "float32"
+
+def test_schema_without_expressions():
+    schema = Schema(make_specs().drop(columns="expression"))
+    data = pd.DataFrame({"xt": [1]})
+    assert schema.derive(data) is data
@@ -0,0 +1,24 @@
+import pytest
+import pandas as pd
+from clams_convert import columnar
+
+pytest.importorskip("pyarrow")
+
+def make_data(experiment):
+    data = experiment(times={"a": ["2020-01-01 00:00:00", "2020-01-01 00:01:00"], "b": ["2020-01-01 00:00:00"]},
+                      light=None, vo2=[1.0, 2.0, 3.0])
+    return data.astype({"subject": "category"})
+
+@pytest.mark.parametrize("file_format", ["parquet", "feather"])
+def test_columnar_roundtrip(tmp_path, experiment, file_format):
+    file = str(tmp_path / ("test." + file_format))
+    columnar.write_table(make_data(experiment), file, {"filetype": "analysis-vis"}, file_format)
+    assert columnar.detect_format(file) == file_format
+    data, metadata = columnar.read_table(file, file_format)
+    pd.testing.assert_frame_equal(data, make_data(experiment))
+    assert metadata == {"filetype": "analysis-vis"}
+
+def test_detect_format_csv(tmp_path):
+    file = tmp_path / "test.csv"
+    file.write_text("[Metadata]\nfiletype,analysis-vis\n")
+    assert columnar.detect_format(str(file)) is None
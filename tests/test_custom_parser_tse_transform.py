@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+from clams_convert.custom_parser import ClamsTseParser
+from clams_convert.col_mapper import ColMapper
+
+def make_raw():
+    return pd.DataFrame({
+        "Date": ["3/20/17"] * 8,
+        "Time": ["16:10", "16:13", "16:16", "16:19"] * 2,
+        "Animal No.": [1] * 4 + [2] * 4,
+        "VO2(1)": [np.nan, 10.0, np.nan, 30.0, np.nan, 20.0, 40.0, np.nan],
+        "Feed": [1.0, 1.5, 1.5, 2.0, 7.0, 7.25, 7.5, 8.0],
+        "Drink": [0.0, 0.0, 0.1, 0.1, 3.0, 3.0, 3.0, 3.5],
+    })
+
+def test_transform_per_subject():
+    parser = ClamsTseParser("%m/%d/%y %H:%M", ColMapper("clams-tse"))
+    data = parser.transform(make_raw())
+    assert list(data["Animal No."]) == [1] * 3 + [2] * 3
+    assert list(data["interval"]) == [0, 1, 2] * 2
+    assert list(data["Feed"]) == [0.5, 0.0, 0.5, 0.25, 0.25, 0.5]
+    assert list(data["Drink"]) == [0.0, 0.1, 0.0, 0.0, 0.0, 0.5]
+    # gaps are filled only from observations of the same subject
+    assert list(data["VO2(1)"]) == [10.0, 20.0, 30.0, 20.0, 40.0, 40.0]
+
+def test_transform_interleaved_subjects():
+    # rows of the animals alternate, as in exports sorted by time
+    raw = pd.DataFrame({
+        "Date": ["3/20/17"] * 8,
+        "Time": ["16:10", "16:10", "16:13", "16:13", "16:16", "16:16", "16:19", "16:19"],
+        "Animal No.": [1, 2] * 4,
+        "VO2(1)": [10.0, 100.0, np.nan, 150.0, 30.0, np.nan, 40.0, 300.0],
+        "Feed": [1.0, 7.0, 1.5, 7.25, 1.5, 7.5, 2.0, 8.0],
+        "Drink": [0.0, 3.0, 0.0, 3.0, 0.1, 3.0, 0.1, 3.5],
+    })
+    parser = ClamsTseParser("%m/%d/%y %H:%M", ColMapper("clams-tse"))
+    data = parser.transform(raw)
+    assert list(data["Animal No."]) == [1, 2] * 3
+    assert list(data["interval"]) == [0, 0, 1, 1, 2, 2]
+    assert list(data["VO2(1)"]) == [20.0, 150.0, 30.0, 225.0, 40.0, 300.0]
+    assert list(data["Feed"]) == [0.5, 0.25, 0.0, 0.25, 0.5, 0.5]
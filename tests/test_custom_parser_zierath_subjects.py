@@ -0,0 +1,30 @@
+from clams_convert.col_mapper import ColMapper
+from clams_convert.custom_parser import FwrZierathParser
+from clams_convert.datafile import Datafile
+
+def make_parser(header):
+    parser = FwrZierathParser("%d/%m/%Y %H:%M:%S", ColMapper("fwr-zierath"))
+    parser.line_numbers = {"file_type": 0, "subject": 1, "data_start": len(header) - 1}
+    return parser
+
+def test_parse_subject_names():
+    header = ["Channel Name:,Running Wheels,Running Wheels",
+              "Channel Group:,Mouse 1,Mouse 2",
+              "Sensor Type:,2,2"]
+    assert make_parser(header).parse_subject_names(header) == ["Mouse_1", "Mouse_2"]
+
+def test_parse_subject_names_wrapped():
+    # the wrapped continuation line starts with the last name of the previous line
+    header = ["Channel Name:,Running Wheels,Running Wheels,Running Wheels",
+              "Channel Group:,Mouse 1,Mouse 2,Mouse 3",
+              "Mouse 3,Mouse 4,Mouse 5\r\n",
+              "Sensor Type:,2,2,2,2,2"]
+    subjects = make_parser(header).parse_subject_names(header)
+    assert subjects == ["Mouse_1", "Mouse_2", "Mouse_3", "Mouse_4", "Mouse_5"]
+
+def test_parameters_without_light(experiment):
+    data = experiment(subjects=("Mouse_1",), times=3, start="2019-07-23 10:30:49", freq="10min", light=None,
+                      distance=[0.6912, 0.0, 1.3824])
+    datafile = Datafile(data)
+    assert datafile.parameters == ["distance"]
+    assert datafile.freq == 600
@@ -0,0 +1,26 @@
+import pytest
+import pandas as pd
+from clams_convert.custom_parser import FwrZierathOldParser
+from clams_convert.col_mapper import ColMapper
+from clams_convert import errors as e
+
+def make_raw():
+    columns = {}
+    times = {"1-1": ["13:43:07", "13:58:07"], "11-1": ["13:43:07", "13:58:07"], "2-1": ["14:00:00", "14:15:00"]}
+    for i, (subject, clock) in enumerate(times.items()):
+        columns[subject + " LAKE08-1 Turns Date"] = ["08/01/16", "08/01/16"]
+        columns[subject + " LAKE08-1 Turns Time"] = clock
+        columns[subject + " LAKE08-1 Turns Data"] = [str(i), str(10 * i)]
+    return pd.DataFrame(columns)
+
+def test_prettify_long_format():
+    parser = FwrZierathOldParser("%m/%d/%y %H:%M:%S", ColMapper("fwr-zierathold"))
+    data = parser.prettify(make_raw(), ["1-1", "11-1", "2-1"])
+    assert list(data.subject) == ["1-1"] * 2 + ["11-1"] * 2 + ["2-1"] * 2
+    assert list(data.interval) == [0, 1] * 3
+    assert list(data.distance) == pytest.approx([0, 0, 0.6912, 6.912, 1.3824, 13.824])
+    assert list(data.date_time.dt.strftime("%H:%M")) == ["13:43", "13:58"] * 2 + ["14:00", "14:15"]
+
+def test_column_layout_missing():
+    with pytest.raises(e.FileFormatError):
+        FwrZierathOldParser.column_layout(make_raw().columns[:-1], ["1-1", "11-1", "2-1"])
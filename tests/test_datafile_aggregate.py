@@ -0,0 +1,32 @@
+import pytest
+import pandas as pd
+from clams_convert.datafile import Datafile
+
+def make_datafile(experiment):
+    d = Datafile(experiment(vo2=[1.0, 3.0, 5.0, 7.0, 2.0, 2.0, 4.0, 4.0], xt=[1, 2, 3, 4, 5, 6, 7, 8]))
+    d.allowed_agg_freq = [120]
+    return d
+
+def test_aggregate_per_column_rules(experiment):
+    df = make_datafile(experiment).aggregate(120, dict(vo2="mean", xt="sum")).data
+    assert df.vo2.tolist() == [2.0, 6.0, 2.0, 4.0]
+    assert df.xt.tolist() == [3, 7, 11, 15]
+    assert df.light.tolist() == [1, 0, 1, 0]
+
+def test_aggregate_intervals(experiment):
+    df = make_datafile(experiment).aggregate("120s", dict(vo2="mean", xt="sum")).data
+    assert df.interval.tolist() == [0, 1, 0, 1]
+    assert df.date_time.tolist()[:2] == [pd.Timestamp("2020-01-01 00:00:00"), pd.Timestamp("2020-01-01 00:02:00")]
+
+def test_aggregate_keeps_dtypes(experiment):
+    df = make_datafile(experiment).aggregate(120, dict(vo2="mean", xt="sum")).data
+    assert df.subject.dtype == "category"
+    assert df.light.dtype == "int8"
+    assert df.xt.dtype == "uint16"
+
+def test_aggregate_keeps_totals(experiment):
+    d = make_datafile(experiment)
+    df = d.aggregate(120, dict(vo2="mean", xt="sum")).data
+    assert df.groupby("subject").xt.sum().tolist() == [10, 26]
+    assert df.xt.sum() == d.data.xt.sum() == 36
+    assert df.groupby("subject").vo2.mean().tolist() == [4.0, 3.0]
@@ -0,0 +1,28 @@
+import pytest
+from clams_convert.datafile import allowed_agg_frequencies, divisors, validate_frequency, \
+    find_common_divisors, divisible
+from clams_convert import errors as e
+
+def test_divisors():
+    assert divisors(1) == [1]
+    assert divisors(12) == [1, 2, 3, 4, 6, 12]
+    assert divisors(43200) == find_common_divisors(43200, 43200)
+
+@pytest.mark.parametrize("phase1, phase2, freq", [
+    (43200, 43200, 60), (36000, 50400, 120), (43200, 43200, 7), (45000, 41400, 600)])
+def test_allowed_agg_frequencies_same_as_enumeration(phase1, phase2, freq):
+    expected = divisible(find_common_divisors(phase1, phase2), freq)
+    assert list(allowed_agg_frequencies(phase1, phase2, freq)) == expected
+
+def test_allowed_agg_frequencies_incomplete_phase():
+    assert allowed_agg_frequencies(86400, 0, 60) == ()
+    assert allowed_agg_frequencies(43200, 43200, None) == ()
+
+def test_validate_frequency():
+    assert validate_frequency(0) == 0
+    assert validate_frequency(None) is None
+    assert validate_frequency(3600) == 3600
+    with pytest.raises(e.AggregationFrequencyError):
+        validate_frequency(7)
+    with pytest.raises(e.AggregationFrequencyError):
+        validate_frequency(-60)
@@ -0,0 +1,36 @@
+import pytest
+import pandas as pd
+from clams_convert.datafile import Datafile
+
+def make_datafile(experiment):
+    return Datafile(experiment(distance=[0.0, 100.0, 250.0, 1000.0], feed=[0.5, 1.0, 0.0, 2.5],
+                               vo2=[3000.0, 3100.0, 3200.0, 3300.0]))
+
+def test_convert_units(experiment):
+    d = make_datafile(experiment)
+    c = d.convert_units({"distance": "km", "feed": "mg"})
+    assert c is not d
+    assert c.data.distance.tolist() == pytest.approx([0.0, 0.1, 0.25, 1.0] * 2)
+    assert c.data.feed.tolist() == pytest.approx([500.0, 1000.0, 0.0, 2500.0] * 2)
+    assert c.data.vo2.tolist() == d.data.vo2.tolist()
+    assert d.data.distance.tolist() == [0.0, 100.0, 250.0, 1000.0] * 2
+
+def test_convert_units_inplace(experiment):
+    d = make_datafile(experiment)
+    assert d.convert_units({"vo2": "[l/h/kg]"}, inplace=True) is d
+    assert d.data.vo2.tolist() == pytest.approx([3.0, 3.1, 3.2, 3.3] * 2)
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_export_roundtrip(tmp_path, experiment, compression):
+    d = make_datafile(experiment).convert_units({"distance": "km"})
+    path = str(tmp_path / ("export.csv" + (".gz" if compression else "")))
+    d.export(path, compression=compression)
+    if compression is not None:
+        with open(path, "rb") as file:
+            assert file.read(2) == b"\x1f\x8b"
+    data = pd.read_csv(path, parse_dates=["date_time"])
+    assert data.columns.tolist() == d.data.columns.tolist()
+    assert data.subject.tolist() == ["a"] * 4 + ["b"] * 4
+    assert data.date_time.tolist() == d.data.date_time.tolist()
+    assert data.distance.tolist() == pytest.approx([0.0, 0.1, 0.25, 1.0] * 2)
+    assert data.feed.sum() == pytest.approx(8.0)
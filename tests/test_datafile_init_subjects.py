@@ -0,0 +1,22 @@
+import pytest
+from clams_convert.datafile import Datafile
+
+def make_datafile(experiment):
+    # rows of the subjects interleaved and out of order
+    times = {"a": ["2020-01-01 00:00:00", "2020-01-01 00:01:00", "2020-01-01 00:02:00"],
+             "b": ["2020-01-01 00:00:00", "2020-01-01 00:01:00"]}
+    data = experiment(times=times, light=[1, 0, 0, 1, 1], vo2=[1.0, 2.0, 5.0, 3.0, 4.0])
+    return Datafile(data.iloc[[4, 0, 3, 1, 2]].reset_index(drop=True))
+
+def test_init_subjects_ranges(experiment):
+    d = make_datafile(experiment)
+    assert d.subjects == ["a", "b"]
+    assert {k: tuple(v) for k, v in d.subject_ranges.items()} == {"a": (0, 3), "b": (3, 5)}
+    assert d.num_observations == {"a": 3, "b": 2}
+
+def test_subject_split_data_ordered(experiment):
+    d = make_datafile(experiment)
+    assert d.subject_split_data["b"].vo2.tolist() == [3.0, 4.0]
+
+def test_subject_row_positions(experiment):
+    assert list(make_datafile(experiment).subject_row_positions()) == [0, 1, 2, 0, 1]
@@ -0,0 +1,32 @@
+import pytest
+from clams_convert.datafile import Datafile
+
+def make_datafile(experiment):
+    times = ["2020-01-01 00:00:00", "2020-01-01 00:01:00", "2020-01-01 00:02:00", "2020-01-01 00:04:00"]
+    return Datafile(experiment(times=times, vo2=[1.0, 3.0, 5.0, 7.0, 2.0, 2.0, 4.0, 4.0]))
+
+def test_lazy_attributes_computed_on_access(experiment):
+    d = make_datafile(experiment)
+    assert "freq" not in d.__dict__
+    assert d.freq == 60
+    assert d.regular is False
+    assert "subject_freq" in d.__dict__
+    assert d.parameters == ["vo2"]
+
+def test_lazy_attributes_unknown(experiment):
+    with pytest.raises(AttributeError):
+        make_datafile(experiment).unknown_attribute
+
+def test_lazy_attributes_propagated(experiment):
+    r = make_datafile(experiment).regularize()
+    assert r.__dict__["freq"] == 60
+    assert r.__dict__["regular"] is True
+    e = r.equalize_observations()
+    assert e.__dict__["freq"] == 60
+    assert "start_date" not in e.__dict__
+
+def test_lazy_attributes_reset_inplace(experiment):
+    d = make_datafile(experiment)
+    assert d.regular is False
+    d.regularize(inplace=True)
+    assert d.regular is True
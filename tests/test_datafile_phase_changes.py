@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+from clams_convert.datafile import Datafile, round_minutes
+
+def make_datafile(experiment, light):
+    n = len(light)
+    return Datafile(experiment(times=n, freq="6H", light=light + light[::-1], vo2=np.arange(2 * n, dtype=float)))
+
+def test_phase_changes_all_transitions(experiment):
+    d = make_datafile(experiment, [1, 1, 0, 0, 1, 1, 0, 0])
+    assert d.phase_change_indices == (2, 4, 6)
+    assert d.phase_change_dates[1] - d.phase_change_dates[0] == pd.Timedelta(hours=12)
+    assert list(d.phase_changes.row) == [2, 4, 6, 10, 12, 14]
+    assert list(d.phase_changes.subject) == ["a"] * 3 + ["b"] * 3
+    assert list(d.phase_changes.light) == [0, 1, 0, 1, 0, 1]
+
+def test_phase_changes_not_across_subjects(experiment):
+    d = make_datafile(experiment, [1, 1, 1, 0])
+    assert list(d.phase_changes.row) == [3, 5]
+    assert d.allowed_agg_freq == []
+
+def test_start_end_date(experiment):
+    d = make_datafile(experiment, [1, 1, 0, 0])
+    assert d.start_date == round_minutes(pd.Timestamp("2020-01-01 00:00:00"))
+    assert d.end_date == round_minutes(pd.Timestamp("2020-01-01 18:00:00"))
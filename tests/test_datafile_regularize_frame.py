@@ -0,0 +1,24 @@
+import pytest
+import numpy as np
+from clams_convert.datafile import regularize_frame
+
+def make_data(experiment):
+    times = {"a": ["2020-01-01 00:00:00", "2020-01-01 00:01:00", "2020-01-01 00:03:00"],
+             "b": ["2020-01-01 00:01:00", "2020-01-01 00:02:00"]}
+    return experiment(times=times, light=[1, 1, 0, 1, 0], vo2=[0.0, 6.0, 12.0, 1.0, 3.0])
+
+def test_regularize_frame_interpolation(experiment):
+    df = regularize_frame(make_data(experiment), ["vo2"], "2020-01-01 00:00:00", "2020-01-01 00:03:00", 30)
+    a = df[df.subject == "a"].vo2.tolist()
+    assert a == [0.0, 3.0, 6.0, 7.5, 9.0, 10.5, 12.0]
+
+def test_regularize_frame_boundaries(experiment):
+    df = regularize_frame(make_data(experiment), ["vo2"], "2020-01-01 00:00:00", "2020-01-01 00:03:00", 60)
+    b = df[df.subject == "b"].vo2.tolist()
+    assert np.isnan(b[0])
+    assert b[1:] == [1.0, 3.0, 3.0]
+
+def test_regularize_frame_light(experiment):
+    df = regularize_frame(make_data(experiment), ["vo2"], "2020-01-01 00:00:00", "2020-01-01 00:03:00", 60)
+    assert df.light.tolist() == [1, 1, 1, 0, 1, 1, 0, 0]
+    assert df.interval.tolist() == [0, 1, 2, 3, 0, 1, 2, 3]
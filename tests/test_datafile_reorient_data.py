@@ -0,0 +1,27 @@
+import pytest
+import numpy as np
+import pandas as pd
+from clams_convert.datafile import Datafile
+
+def make_data(experiment, shift=0):
+    times = pd.to_datetime(["2020-01-01 00:00:00", "2020-01-01 00:01:00", "2020-01-01 00:02:00"])
+    return experiment(times={"b": times, "a": times + pd.Timedelta(seconds=shift)}, light=[1, 1, 0],
+                      vo2=[1.0, 2.0, 3.0, 4.0, 5.0, np.nan], xt=[1, 2, 3, 4, 5, 6])
+
+def expected(experiment, shift=0):
+    data = make_data(experiment, shift)
+    df = data.melt(id_vars=["subject", "date_time", "interval", "light"], var_name="parameter")
+    df = df.pivot_table(index=["parameter", "date_time", "interval", "light"], columns="subject").reset_index()
+    df.columns = [b if a == "value" else a for a, b in df.columns]
+    return df
+
+@pytest.mark.parametrize("shift", [0, 30])
+def test_reorient_data_subject_wide(experiment, shift):
+    d = Datafile(make_data(experiment, shift))
+    assert (d.aligned_subject_wide() is not None) == (shift == 0)
+    df = d.reorient_data("subject-wide")
+    pd.testing.assert_frame_equal(df, expected(experiment, shift), check_dtype=False)
+
+def test_reorient_data_parameter_wide(experiment):
+    d = Datafile(make_data(experiment))
+    assert d.reorient_data("parameter-wide") is d.data
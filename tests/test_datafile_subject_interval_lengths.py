@@ -0,0 +1,20 @@
+import pytest
+import pandas as pd
+from collections import Counter
+from clams_convert.datafile import Datafile
+
+def make_datafile(experiment):
+    times = {"a": ["2020-01-01 00:00:00", "2020-01-01 00:01:00", "2020-01-01 00:02:00",
+                   "2020-01-01 00:04:00", "2020-01-01 00:05:00"],
+             "b": ["2020-01-01 00:00:00", "2020-01-01 00:02:00", "2020-01-01 00:04:00"]}
+    return Datafile(experiment(times=times, light=[1, 1, 1, 0, 0, 1, 1, 0], vo2=range(8)))
+
+def test_subject_interval_lengths(experiment):
+    lengths = make_datafile(experiment).subject_interval_lengths()
+    assert lengths["a"] == Counter({pd.Timedelta(minutes=1): 3, pd.Timedelta(minutes=2): 1})
+    assert lengths["b"] == Counter({pd.Timedelta(minutes=2): 2})
+
+def test_subject_interval_lengths_sample(experiment):
+    lengths = make_datafile(experiment).subject_interval_lengths(sample=2)
+    assert lengths["a"] == Counter({pd.Timedelta(minutes=1): 2})
+    assert lengths["b"] == Counter({pd.Timedelta(minutes=2): 2})
@@ -0,0 +1,34 @@
+import clams_convert.custom_parser as fp
+from clams_convert.detector import Detector
+
+parsers = {"clams-oxymax": fp.ClamsOxymaxParser,
+           "clams-tse": fp.ClamsTseParser,
+           "fwr-zierathold": fp.FwrZierathOldParser,
+           "fwr-zierath": fp.FwrZierathParser,
+           "fwr-canlon": fp.FwrCanlonParser,
+           "fwr-westerblad": fp.FwrWesterbladParser}
+
+def test_detect_test_inputs():
+    detector = Detector(parsers)
+    assert detector.detect("test_data/test_input/classic_2/2019-09-09.0101.CSV") == "clams-oxymax"
+    assert detector.detect("test_data/test_input/paula_tse_1/20170320_all_data.csv") == "clams-tse"
+    assert detector.detect("test_data/test_input/zierathold_1/week1.asc") == "fwr-zierathold"
+    assert detector.detect("test_data/test_input/zierath_1/01_zierath.csv") == "fwr-zierath"
+    assert detector.detect("test_data/test_input/classic_2/2019-09-09.VO2.CSV") is None
+
+def test_detect_reads_only_head(tmp_path):
+    file = tmp_path / "late.csv"
+    file.write_bytes(b"x" * 100 + b"\nOxymax CSV File\n")
+    assert Detector(parsers, sniff_size=50).detect(str(file)) is None
+    assert Detector(parsers, sniff_size=200).detect(str(file)) == "clams-oxymax"
+
+def test_classify(tmp_path):
+    files = []
+    for name, content in [("a.csv", b"Date,Time,Animal No.\n"), ("b.csv", b"unknown\n"),
+                          ("c.csv", b"Oxymax CSV File\n"), ("d.csv", b"Date,Time,Animal No.\n")]:
+        (tmp_path / name).write_bytes(content)
+        files.append(str(tmp_path / name))
+    routes = Detector(parsers).classify(files)
+    assert list(routes.keys()) == ["clams-tse", None, "clams-oxymax"]
+    assert routes["clams-tse"] == [files[0], files[3]]
+    assert routes[None] == [files[1]]
@@ -0,0 +1,27 @@
+import io
+import gzip
+import pytest
+from clams_convert import exporter
+
+def make_data(experiment, n=10):
+    return experiment(subjects=("a",), times=n, start="2020-01-01 23:58:00", light=None,
+                      vo2=[x / 3 for x in range(n)])
+
+@pytest.mark.parametrize("time_fmt", ["%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M", "%b %d %Y %H:%M"])
+def test_write_csv_matches_to_csv(experiment, time_fmt):
+    data = make_data(experiment)
+    file = io.StringIO()
+    exporter.write_csv(data, file, time_fmt, chunk_size=3)
+    assert file.getvalue() == data.to_csv(index=False, date_format=time_fmt, lineterminator="\n")
+
+def test_write_csv_empty(experiment):
+    file = io.StringIO()
+    exporter.write_csv(make_data(experiment, 0), file, "%Y-%m-%d %H:%M:%S")
+    assert file.getvalue() == "subject,date_time,interval,vo2\n"
+
+def test_open_output_gzip(tmp_path, experiment):
+    path = str(tmp_path / "test.csv.gz")
+    with exporter.open_output(path, "gzip") as file:
+        exporter.write_csv(make_data(experiment), file, "%Y-%m-%d %H:%M:%S")
+    with gzip.open(path, "rt") as file:
+        assert file.read() == make_data(experiment).to_csv(index=False, lineterminator="\n")
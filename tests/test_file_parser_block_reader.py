@@ -0,0 +1,17 @@
+import io
+import pytest
+import pandas as pd
+from clams_convert.file_parser import BlockReader
+
+def test_block_reader_range():
+    file = io.BytesIO(b"header\n1,2\n3,4\n:EVENTS\n")
+    assert BlockReader(file, 7, 15).read() == b"1,2\n3,4\n"
+
+def test_block_reader_to_end():
+    file = io.BytesIO(b"header\n1,2\n3,4\n")
+    assert BlockReader(file, 7).read() == b"1,2\n3,4\n"
+
+def test_block_reader_csv():
+    file = io.BytesIO(b"header\n1,2\n3,4\n:EVENTS\n")
+    df = pd.read_csv(BlockReader(file, 7, 15), header=None)
+    assert df.values.tolist() == [[1, 2], [3, 4]]
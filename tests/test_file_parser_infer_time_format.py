@@ -0,0 +1,28 @@
+import pytest
+import pandas as pd
+from clams_convert.file_parser import infer_time_format
+
+def timestamps(start, fmt, periods=100, freq="1h"):
+    return pd.date_range(start, periods=periods, freq=freq).strftime(fmt)
+
+def test_infer_time_format_day_first():
+    text = timestamps("2019-06-24 15:22:58", "%d/%m/%Y %H:%M:%S")
+    assert infer_time_format(text) == "%d/%m/%Y %H:%M:%S"
+
+def test_infer_time_format_twelve_hour():
+    text = timestamps("2017-02-06 17:08:20", "%m/%d/%Y %I:%M:%S %p", periods=400)
+    assert infer_time_format(text) == "%m/%d/%Y %I:%M:%S %p"
+
+def test_infer_time_format_same_day_and_month():
+    # day and month are equal, both orders give the same timestamps
+    text = timestamps("2019-09-09 11:22:43", "%d/%m/%Y %H:%M:%S", periods=10)
+    assert infer_time_format(text) in ("%d/%m/%Y %H:%M:%S", "%m/%d/%Y %H:%M:%S")
+
+def test_infer_time_format_ambiguous():
+    text = timestamps("2019-07-01 12:56:12", "%d/%m/%Y %H:%M:%S")
+    with pytest.raises(ValueError, match="ambiguous"):
+        infer_time_format(text)
+
+def test_infer_time_format_not_recognized():
+    with pytest.raises(ValueError, match="not recognized"):
+        infer_time_format(["2019 June 24"])
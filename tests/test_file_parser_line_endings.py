@@ -0,0 +1,50 @@
+import io
+import pytest
+import pandas as pd
+from clams_convert import errors as e
+from clams_convert.col_mapper import ColMapper
+from clams_convert.custom_parser import ClamsOxymaxParser
+from clams_convert.file_parser import iter_lines, rsearch_line
+
+SOURCE = "test_data/test_input/classic_2/2019-09-09.0101.CSV"
+FORMAT = "%d/%m/%Y %H:%M:%S"
+
+def make_parser():
+    return ClamsOxymaxParser(FORMAT, ColMapper("clams-oxymax"))
+
+@pytest.mark.parametrize("block_size", [1, 2, 5, 1024])
+def test_iter_lines(block_size):
+    text = b"a\r\nbb\rccc\n\r\nd"
+    lines = list(iter_lines(io.BytesIO(text), block_size=block_size))
+    assert [x[0] for x in lines] == [b"a", b"bb", b"ccc", b"", b"d"]
+    assert [x[1] for x in lines] == [0, 3, 6, 10, 12]
+    assert lines[-1][2] == len(text)
+
+def test_rsearch_line_carriage_return():
+    text = b"1,2\r:EVENTS\r3,4\r"
+    assert rsearch_line(io.BytesIO(text), b":EVENTS", block_size=4) == 4
+
+@pytest.mark.parametrize("line_end", [b"\r", b"\r\n"])
+def test_parse_line_endings(tmp_path, line_end):
+    with open(SOURCE, "rb") as f:
+        lines = f.read().splitlines()
+    reference = tmp_path / "lf.csv"
+    reference.write_bytes(b"\n".join(lines) + b"\n")
+    file = tmp_path / "other.csv"
+    file.write_bytes(line_end.join(lines) + line_end)
+    expected = make_parser().parse(str(reference))
+    data = make_parser().parse(str(file))
+    pd.testing.assert_frame_equal(data, expected)
+    assert len(data) == 290
+    assert str(data.date_time.iloc[0]) == "2019-09-09 11:22:43"
+    assert data.vo2.iloc[0] == 4038.0
+
+def test_parse_carriage_return_file():
+    # old Oxymax export with bare \r line endings and a corrupted record at its end
+    parser = ClamsOxymaxParser("%m/%d/%Y %I:%M:%S %p", ColMapper("clams-oxymax"))
+    file = "test_data/test_input/classic_1/2017-10-09.0108.CSV"
+    with open(file, "rb") as f:
+        header = parser.locate_sections(f)
+    assert parser.parse_subject_names(header) == "T24"
+    with pytest.raises(e.FileFormatError):
+        parser.parse(file)
@@ -0,0 +1,46 @@
+import io
+from clams_convert.col_mapper import ColMapper
+from clams_convert.custom_parser import FwrZierathParser
+
+FORMAT = "%d/%m/%Y %H:%M:%S"
+HEADER = [
+    b"Channel Name:,Running Wheels,Running Wheels",
+    b"Channel Group:,Mouse 1,Mouse 2",
+    b"Sensor Type:,2,2",
+]
+DATA = [
+    b"23/07/2019 10:30:49,1,40",
+    b"23/07/2019 10:40:49,0,35",
+]
+
+def make_parser():
+    return FwrZierathParser(FORMAT, ColMapper("fwr-zierath"))
+
+def test_locate_sections_repeated_header():
+    text = b"\r\n".join(HEADER + HEADER + DATA) + b"\r\n"
+    parser = make_parser()
+    file = io.BytesIO(text)
+    header = parser.locate_sections(file)
+    assert parser.line_numbers == {"file_type": 3, "subject": 4, "data_start": 5}
+    assert len(header) == 6
+    assert parser.positions["data_start"] == text.index(DATA[0])
+    assert parser.parse_subject_names(header) == ["Mouse_1", "Mouse_2"]
+
+def test_parse_repeated_header_file():
+    data = make_parser().parse("test_data/test_input/zierath_3/2019 week 9 b.csv")
+    assert data["subject"].nunique() == 20
+    assert str(data["date_time"].min()) == "2019-07-23 10:30:49"
+
+def test_locate_sections_offset_zero():
+    # data starts on the anchor line itself
+    text = b"\r\n".join(HEADER[:2] + DATA) + b"\r\n"
+    parser = make_parser()
+    parser.update_info(patterns=dict(data_start="^[0-9]{2}/"), offsets=dict(data_start=0, header_start=-1))
+    file = io.BytesIO(text)
+    header = parser.locate_sections(file)
+    assert parser.line_numbers["data_start"] == 2
+    assert parser.positions["data_start"] == text.index(DATA[0])
+    assert len(header) == 2
+    data = parser.read_data(file, header)
+    assert len(data) == 2
+    assert list(data.iloc[:, 0]) == ["23/07/2019 10:30:49", "23/07/2019 10:40:49"]
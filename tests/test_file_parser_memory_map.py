@@ -0,0 +1,32 @@
+import pytest
+import pandas as pd
+from clams_convert.col_mapper import ColMapper
+from clams_convert.custom_parser import ClamsTseParser
+
+SOURCE = "test_data/test_input/paula_tse_1/20170320_all_data.csv"
+
+def make_file(tmp_path):
+    # units row with a degree sign written in a single byte encoding
+    with open(SOURCE, "rb") as f:
+        lines = f.read().split(b"\n")[:40]
+    lines[1] = lines[1].replace(b"[C]", "[°C]".encode("latin-1"))
+    file = tmp_path / "tse.csv"
+    file.write_bytes(b"\n".join(lines))
+    return str(file)
+
+@pytest.mark.parametrize("memory_map", [False, True])
+def test_file_parser_memory_map(tmp_path, memory_map):
+    file = make_file(tmp_path)
+    reference = ClamsTseParser("%m/%d/%y %H:%M", ColMapper("clams-tse")).parse(file)
+    parser = ClamsTseParser("%m/%d/%y %H:%M", ColMapper("clams-tse"))
+    parser.memory_map = memory_map
+    data = parser.parse(file)
+    pd.testing.assert_frame_equal(data, reference)
+    assert len(data) == 37
+    assert str(data.date_time.iloc[0]) == "2017-03-20 16:13:00"
+    assert str(data.date_time.iloc[-1]) == "2017-03-20 18:01:00"
+
+def test_file_parser_decode_line():
+    parser = ClamsTseParser("%m/%d/%y %H:%M", ColMapper("clams-tse"))
+    assert parser.decode_line("[°C]".encode("latin-1")) == "[°C]"
+    assert parser.decode_line("[°C]".encode("utf-8")) == "[°C]"
@@ -0,0 +1,52 @@
+import pytest
+import numpy as np
+import pandas as pd
+from clams_convert.file_parser import parse_timestamps, datetime_layout, format_datetimes
+
+fmt = "%d/%m/%Y %H:%M:%S"
+
+def reference(text, fmt):
+    return pd.to_datetime(text, format=fmt).values
+
+def test_datetime_layout_non_numeric():
+    assert datetime_layout("%d %b %Y") is None
+
+def test_format_datetimes():
+    dt = pd.date_range("2019-09-09 11:22:43", periods=3, freq="20min")
+    assert list(format_datetimes(dt.values, datetime_layout(fmt))) == list(dt.strftime(fmt))
+
+def test_parse_timestamps_regular():
+    text = pd.date_range("2019-09-09 11:22:43", periods=1000, freq="20min").strftime(fmt)
+    assert (parse_timestamps(text, fmt) == reference(text, fmt)).all()
+
+def test_parse_timestamps_deviations():
+    dt = pd.date_range("2019-09-09 11:22:43", periods=1000, freq="3min").values
+    dt[10] += np.timedelta64(5, "s")
+    dt[500:] -= np.timedelta64(1, "D")
+    text = pd.DatetimeIndex(dt).strftime(fmt)
+    assert (parse_timestamps(text, fmt) == reference(text, fmt)).all()
+
+def test_parse_timestamps_unpadded():
+    text = ["3/20/17 16:10", "3/20/17 16:13", "3/20/17 16:16"]
+    assert (parse_timestamps(text, "%m/%d/%y %H:%M") == reference(text, "%m/%d/%y %H:%M")).all()
+
+def test_parse_timestamps_invalid():
+    with pytest.raises(ValueError):
+        parse_timestamps(["foo", "bar"], fmt)
+
+def test_parse_timestamps_jittered_single_fallback(monkeypatch):
+    rng = np.random.default_rng(0)
+    dt = pd.date_range("2019-09-09 11:22:43", periods=5000, freq="5min").values
+    dt[3:] += rng.integers(0, 3, len(dt) - 3).astype("timedelta64[s]")
+    text = pd.DatetimeIndex(dt).strftime(fmt)
+    expected = reference(text, fmt)
+    calls = []
+    to_datetime = pd.to_datetime
+    def counted(*args, **kwargs):
+        calls.append(len(args[0]))
+        return to_datetime(*args, **kwargs)
+    monkeypatch.setattr(pd, "to_datetime", counted)
+    assert (parse_timestamps(text, fmt) == expected).all()
+    # the anchor and one bulk parse of everything after the first deviation
+    assert len(calls) == 2
+    assert sum(calls) <= len(text) + 2
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+from clams_convert.col_mapper import ColMapper
+from clams_convert.custom_parser import ClamsOxymaxParser
+
+SOURCE = "test_data/test_input/classic_2/2019-09-09.0101.CSV"
+
+
+def make_parser():
+    return ClamsOxymaxParser("%d/%m/%Y %H:%M:%S", ColMapper("clams-oxymax"))
+
+def read(file, monkeypatch):
+    # keyword arguments the csv reader was called with are recorded
+    calls = []
+    read_csv = pd.read_csv
+    def recording(*args, **kwargs):
+        calls.append(kwargs)
+        return read_csv(*args, **kwargs)
+    monkeypatch.setattr(pd, "read_csv", recording)
+    parser = make_parser()
+    with open(file, "rb") as current_file:
+        header = parser.locate_sections(current_file)
+        data = parser.read_data(current_file, header)
+    return data, calls[-1]
+
+def test_read_data_typed_columns(monkeypatch):
+    data, kwargs = read(SOURCE, monkeypatch)
+    mapper = make_parser().mapper
+    assert kwargs["engine"] == "c"
+    assert len(kwargs["usecols"]) == len(mapper.source_columns)
+    assert sorted(data.columns) == sorted(mapper.source_columns)
+    assert data["INTERVAL"].dtype == np.int64
+    assert data["XTOT"].dtype == np.int64
+    assert data["VO2"].dtype == np.float64
+    assert data["DATE/TIME"].dtype == object
+    assert data["CHAN"].dtype == object
+    assert len(data) == 290
+    assert data["INTERVAL"].iloc[0] == 1
+    assert data["VO2"].iloc[0] == 4038.0
+
+def test_read_data_columns_not_in_spec(tmp_path, monkeypatch):
+    # a column missing from the spec is never read, a spec column missing from the
+    # file is not requested
+    with open(SOURCE, "rb") as f:
+        lines = f.read().split(b"\n")
+    start = next(i for i, x in enumerate(lines) if x.startswith(b"INTERVAL,"))
+    drop = lines[start].split(b",").index(b"ZTOT")
+    changed = []
+    for i, line in enumerate(lines):
+        if i >= start and line.count(b",") > 10:
+            fields = line.split(b",")
+            del fields[drop]
+            line = b",".join(fields[:3] + [b"EXTRA" if i == start else b"x"] + fields[3:])
+        changed.append(line)
+    file = tmp_path / "changed.CSV"
+    file.write_bytes(b"\n".join(changed))
+
+    data, kwargs = read(str(file), monkeypatch)
+    assert "EXTRA" not in data.columns
+    assert "ZTOT" not in data.columns
+    assert sorted(data.columns) == sorted(x for x in make_parser().mapper.source_columns if x != "ZTOT")
+    assert len(kwargs["usecols"]) == len(data.columns)
+    assert data["VO2"].dtype == np.float64
+    assert data["VO2"].iloc[0] == 4038.0
+    assert data["XTOT"].dtype == np.int64
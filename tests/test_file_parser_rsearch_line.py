@@ -0,0 +1,18 @@
+import io
+import pytest
+from clams_convert.file_parser import rsearch_line
+
+text = b"header\n:DATA\n1,2\n:EVENTS\n3,4\n:EVENTS\n5,6\n"
+
+def test_rsearch_line_last_occurrence():
+    assert rsearch_line(io.BytesIO(text), b":EVENTS") == text.rindex(b":EVENTS")
+
+@pytest.mark.parametrize("block_size", [1, 3, 8, 1024])
+def test_rsearch_line_block_boundaries(block_size):
+    assert rsearch_line(io.BytesIO(text), b"EVENTS", block_size=block_size) == text.rindex(b":EVENTS")
+
+def test_rsearch_line_missing():
+    assert rsearch_line(io.BytesIO(text), b"Subject ID") is None
+
+def test_rsearch_line_before_start():
+    assert rsearch_line(io.BytesIO(text), b":DATA", start=text.index(b"1,2")) is None
@@ -0,0 +1,62 @@
+import os
+import inspect
+import pytest
+import pandas as pd
+from clams_convert.parse_cache import ParseCache, parser_signature
+from clams_convert.custom_parser import ClamsOxymaxParser
+from clams_convert.col_mapper import ColMapper
+
+pytest.importorskip("pyarrow")
+
+def make_data(experiment, n=100):
+    return experiment(subjects=("a",), times=n, light=None, vo2=[float(x) for x in range(n)]).astype(
+        {"subject": "category"})
+
+def test_parse_cache_get_put(tmp_path, experiment):
+    source = tmp_path / "input.csv"
+    source.write_text("a,b\n1,2\n")
+    cache = ParseCache(str(tmp_path / "cache"), "signature")
+    key = cache.key(str(source))
+    assert cache.get(key) is None
+    cache.put(key, make_data(experiment))
+    pd.testing.assert_frame_equal(cache.get(key), make_data(experiment))
+
+def test_parse_cache_key_changes(tmp_path):
+    source = tmp_path / "input.csv"
+    source.write_text("a,b\n1,2\n")
+    cache = ParseCache(str(tmp_path / "cache"), "signature")
+    key = cache.key(str(source))
+    assert ParseCache(str(tmp_path / "cache"), "other").key(str(source)) != key
+    source.write_text("a,b\n1,3\n")
+    assert cache.key(str(source)) != key
+
+def test_parse_cache_evict(tmp_path, experiment):
+    cache = ParseCache(str(tmp_path / "cache"), "signature")
+    cache.put("first", make_data(experiment))
+    size = os.path.getsize(cache.entry("first"))
+    cache.max_size = 2 * size
+    os.utime(cache.entry("first"), (0, 0))
+    cache.put("second", make_data(experiment))
+    os.utime(cache.entry("second"), (1, 1))
+    cache.get("first")
+    cache.put("third", make_data(experiment))
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.get("third") is not None
+
+def test_parse_cache_requires_pyarrow(tmp_path, monkeypatch):
+    def missing():
+        raise ImportError("Parquet and feather formats require the 'pyarrow' package.")
+    monkeypatch.setattr("clams_convert.columnar.import_pyarrow", missing)
+    with pytest.raises(ImportError, match="pyarrow"):
+        ParseCache(str(tmp_path / "cache"), "signature")
+    assert not os.path.exists(tmp_path / "cache")
+
+def test_parser_signature_covers_code(monkeypatch):
+    parser = ClamsOxymaxParser("%d/%m/%Y %H:%M:%S", ColMapper("clams-oxymax"))
+    signature = parser_signature(parser)
+    assert parser_signature(ClamsOxymaxParser("%d/%m/%Y %H:%M:%S", ColMapper("clams-oxymax"))) == signature
+    getsource = inspect.getsource
+    # a changed prettify of the parser module invalidates the cached entries
+    monkeypatch.setattr(inspect, "getsource", lambda x: getsource(x).replace("def prettify", "def  prettify"))
+    assert parser_signature(parser) != signature
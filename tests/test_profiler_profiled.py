@@ -0,0 +1,55 @@
+import pytest
+import tracemalloc
+import numpy as np
+import pandas as pd
+from clams_convert.profiler import Profiler, profiler, profiled
+
+@profiled("make")
+def make_data(n):
+    return pd.DataFrame({"a": range(n)})
+
+def test_profiled_records_rows():
+    profiler.clear()
+    make_data(3)
+    make_data(4)
+    summary = profiler.summary()
+    assert summary.stage.tolist() == ["make"]
+    assert summary.calls.tolist() == [2]
+    assert summary.rows.tolist() == [7]
+    profiler.clear()
+
+def test_profiler_nested_stages():
+    p = Profiler()
+    with p.stage("outer", rows=1):
+        with p.stage("inner", rows=2):
+            pass
+    assert [x["stage"] for x in p.records] == ["outer", "inner"]
+    assert p.records[0]["seconds"] >= p.records[1]["seconds"]
+
+def test_profiler_empty_summary():
+    assert len(Profiler().summary()) == 0
+
+def test_profiler_peak_alloc():
+    p = Profiler()
+    tracemalloc.start()
+    try:
+        with p.stage("outer"):
+            with p.stage("inner"):
+                data = np.ones(2**20)
+                del data
+            data = np.ones(2**18)
+    finally:
+        tracemalloc.stop()
+    outer, inner = p.records
+    # the peak of the nested stage is part of the peak of the enclosing one
+    assert inner["peak_alloc"] >= 8 * 2**20
+    assert outer["peak_alloc"] >= inner["peak_alloc"]
+    assert outer["peak_rss"] >= inner["peak_rss"]
+    assert p.summary().columns.tolist()[-2:] == ["peak_rss_mb", "peak_alloc_mb"]
+
+def test_profiler_no_trace():
+    p = Profiler()
+    with p.stage("untraced"):
+        pass
+    assert "peak_alloc" not in p.records[0]
+    assert "peak_alloc_mb" not in p.summary().columns
@@ -0,0 +1,41 @@
+import pytest
+import numpy as np
+import pandas as pd
+from clams_convert import units
+
+def test_factor_chained_and_inverse():
+    assert units.factor("[turns]", "[m]") == pytest.approx(0.6912)
+    assert units.factor("turns", "km") == pytest.approx(0.6912e-3)
+    assert units.factor("[mg]", "[g]") == pytest.approx(1e-3)
+    assert units.factor("[m]", "[m]") == 1.0
+    with pytest.raises(ValueError):
+        units.factor("[m]", "[ml]")
+
+def test_convert_in_place():
+    data = pd.DataFrame({"subject": ["a", "b"], "feed": [1.0, 2.0], "distance": [10, 20], "rer": [0.7, 0.8]})
+    source = {"feed": "[g]", "distance": "[turns]", "rer": "[]"}
+    result = units.convert(data, source, {"feed": "[mg]", "distance": "[m]", "rer": "[]"})
+    assert result is data
+    assert list(data.feed) == pytest.approx([1000.0, 2000.0])
+    assert list(data.distance) == pytest.approx([6.912, 13.824])
+    assert list(data.rer) == [0.7, 0.8]
+
+def test_convert_keeps_float32():
+    data = pd.DataFrame({"feed": np.array([1.0, 2.0], dtype="float32")})
+    units.convert(data, {"feed": "[g]"}, {"feed": "[mg]"})
+    assert data.feed.dtype == "float32"
+
+def test_parse_units():
+    assert units.parse_units(["distance=km", "feed = [mg]"]) == {"distance": "[km]", "feed": "[mg]"}
+    assert units.parse_units(None) == dict()
+    with pytest.raises(ValueError):
+        units.parse_units(["distance"])
+
+def test_convert_keeps_other_columns():
+    data = pd.DataFrame({"subject": ["a", "b"], "feed": np.array([1.0, 2.0], dtype="float32"),
+                         "drink": [3.0, 4.0]})
+    units.convert(data, {"feed": "[g]", "drink": "[ml]"}, {"feed": "[mg]", "drink": "[ul]"})
+    assert list(data.columns) == ["subject", "feed", "drink"]
+    assert list(data.subject) == ["a", "b"]
+    assert list(data.feed) == pytest.approx([1000.0, 2000.0])
+    assert list(data.drink) == pytest.approx([3000.0, 4000.0])